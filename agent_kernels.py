@@ -0,0 +1,79 @@
+"""Numeric kernels for replaying SimpleBTCAgent decisions over historical arrays"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:  # numba is optional; fall back to plain Python loops
+    HAVE_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+HOLD = 0
+BUY = 1
+SELL = 2
+
+ACTION_NAMES = ("hold", "buy", "sell")
+
+SENTIMENT_NEGATIVE = -1
+SENTIMENT_NEUTRAL = 0
+SENTIMENT_POSITIVE = 1
+
+@njit(parallel=True, cache=True)
+def decide(pos, neg, prices, cash, qty, pnl):
+    """Vectorized make_recommendation: one (action, quantity, confidence) per row"""
+    n = prices.shape[0]
+    actions = np.zeros(n, dtype=np.int8)
+    quantities = np.zeros(n, dtype=np.float64)
+    confidence = np.full(n, 0.5, dtype=np.float64)
+
+    for i in prange(n):
+        has_position = qty[i] > 0.0
+        if not has_position and pos[i] > neg[i] and cash[i] > 1000.0:
+            actions[i] = BUY
+            quantities[i] = min(cash[i] * 0.2, 2000.0) / prices[i]
+            confidence[i] = 0.7
+        elif has_position and neg[i] > pos[i]:
+            actions[i] = SELL
+            quantities[i] = qty[i] * 0.5
+            confidence[i] = 0.6
+        elif has_position and pnl[i] > 1000.0:
+            actions[i] = SELL
+            quantities[i] = qty[i] * 0.3
+            confidence[i] = 0.8
+
+    return actions, quantities, confidence
+
+
+def vectorized_decide(prices, sentiments, cash, qty, pnl):
+    """make_recommendation's branch cascade as NumPy masks; sentiments are SENTIMENT_* codes"""
+    prices = np.asarray(prices, dtype=np.float64)
+    sentiments = np.asarray(sentiments)
+    cash = np.asarray(cash, dtype=np.float64)
+    qty = np.asarray(qty, dtype=np.float64)
+    pnl = np.asarray(pnl, dtype=np.float64)
+
+    has_position = qty > 0.0
+    buy_mask = ~has_position & (sentiments == SENTIMENT_POSITIVE) & (cash > 1000.0)
+    sell_neg_mask = has_position & (sentiments == SENTIMENT_NEGATIVE)
+    take_profit_mask = has_position & (pnl > 1000.0) & ~sell_neg_mask
+
+    actions = np.full(prices.shape, HOLD, dtype=np.int8)
+    actions[buy_mask] = BUY
+    actions[sell_neg_mask | take_profit_mask] = SELL
+
+    quantities = np.zeros(prices.shape, dtype=np.float64)
+    quantities[buy_mask] = np.minimum(cash[buy_mask] * 0.2, 2000.0) / prices[buy_mask]
+    quantities[sell_neg_mask] = qty[sell_neg_mask] * 0.5
+    quantities[take_profit_mask] = qty[take_profit_mask] * 0.3
+
+    confidence = np.full(prices.shape, 0.5, dtype=np.float64)
+    confidence[buy_mask] = 0.7
+    confidence[sell_neg_mask] = 0.6
+    confidence[take_profit_mask] = 0.8
+
+    return actions, quantities, confidence
@@ -1,14 +1,83 @@
 import aiohttp
 import asyncio
-import json
+import orjson
 import os
+import time
+from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Seconds a fetched result is reused before hitting the API again
+PRICE_TTL = 2
+NEWS_TTL = 60
 
 class BTCDataFetcher:
     def __init__(self):
         self.coindesk_api_key = os.getenv('COINDESK_API_KEY')
         self.newsapi_key = os.getenv('NEWSAPI_KEY')
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._cache: Dict[str, tuple] = {}  # key -> (expires_at, value)
+        self._cache_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared keep-alive HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=32,
+                limit_per_host=8,
+                ttl_dns_cache=300,
+                enable_cleanup_closed=True,
+                keepalive_timeout=75
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+    
+    async def _cached(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached result for key, fetching once per TTL even under concurrent callers"""
+        entry = self._cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        
+        async with self._cache_locks[key]:
+            # Another caller may have refreshed the entry while we waited on the lock
+            entry = self._cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            value = await fetch()
+            self._cache[key] = (time.monotonic() + ttl, value)
+            return value
+    
+    async def get_price(self, symbol: str = "BTC") -> Dict:
+        """Get the current price, reusing results younger than PRICE_TTL"""
+        return await self._cached(f"price:{symbol}", PRICE_TTL, self.get_btc_price)
+    
+    async def get_news(self, symbol: str = "BTC") -> List[Dict]:
+        """Get recent news, reusing results younger than NEWS_TTL"""
+        return await self._cached(f"news:{symbol}", NEWS_TTL, self.get_btc_news)
+    
+    async def wait_for_new_bar(self, last_ts=None, timeout: Optional[float] = None) -> Dict:
+        """Long-poll the price feed until it reports a timestamp other than last_ts"""
+        async def poll():
+            while True:
+                price_data = await self.get_price()
+                if price_data.get("timestamp") != last_ts:
+                    return price_data
+                await asyncio.sleep(PRICE_TTL)
+        
+        return await asyncio.wait_for(poll(), timeout=timeout)
+    
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
         
     async def get_btc_price(self) -> Dict:
         """Get current BTC price from CoinDesk"""
@@ -23,18 +92,18 @@ class BTCDataFetcher:
             }
             headers = {"Authorization": f"Bearer {self.coindesk_api_key}"}
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("Data") and len(data["Data"]) > 0:
-                            latest = data["Data"][-1]
-                            return {
-                                "price": latest.get("VALUE"),
-                                "timestamp": latest.get("LAST_UPDATE"),
-                                "instrument": "BTC-USD",
-                                "source": "coindesk"
-                            }
+            session = await self._get_session()
+            async with session.get(url, params=params, headers=headers) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    if data.get("Data") and len(data["Data"]) > 0:
+                        latest = data["Data"][-1]
+                        return {
+                            "price": latest.get("VALUE"),
+                            "timestamp": latest.get("LAST_UPDATE"),
+                            "instrument": "BTC-USD",
+                            "source": "coindesk"
+                        }
         except Exception as e:
             print(f"CoinDesk API error: {e}")
             
@@ -45,33 +114,33 @@ class BTCDataFetcher:
         # Try CoinGecko first
         try:
             url = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return {
-                            "price": float(data["bitcoin"]["usd"]),
-                            "timestamp": datetime.now().isoformat(),
-                            "instrument": "BTC-USD",
-                            "source": "coingecko"
-                        }
+            session = await self._get_session()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    return {
+                        "price": float(data["bitcoin"]["usd"]),
+                        "timestamp": datetime.now().isoformat(),
+                        "instrument": "BTC-USD",
+                        "source": "coingecko"
+                    }
         except Exception as e:
             print(f"CoinGecko API error: {e}")
         
         # Try CoinDesk free API
         try:
             url = "https://api.coindesk.com/v1/bpi/currentprice/USD.json"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        price_str = data["bpi"]["USD"]["rate"].replace(",", "").replace("$", "")
-                        return {
-                            "price": float(price_str),
-                            "timestamp": datetime.now().isoformat(),
-                            "instrument": "BTC-USD",
-                            "source": "coindesk_free"
-                        }
+            session = await self._get_session()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    price_str = data["bpi"]["USD"]["rate"].replace(",", "").replace("$", "")
+                    return {
+                        "price": float(price_str),
+                        "timestamp": datetime.now().isoformat(),
+                        "instrument": "BTC-USD",
+                        "source": "coindesk_free"
+                    }
         except Exception as e:
             print(f"CoinDesk free API error: {e}")
         
@@ -96,25 +165,25 @@ class BTCDataFetcher:
             }
             headers = {"X-API-Key": self.newsapi_key}
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        articles = []
-                        for article in data.get("articles", []):
-                            if article.get("title"):  # Only include articles with titles
-                                articles.append({
-                                    "title": article.get("title", ""),
-                                    "description": article.get("description", ""),
-                                    "url": article.get("url", ""),
-                                    "published_at": article.get("publishedAt", ""),
-                                    "source": article.get("source", {}).get("name", "Unknown") if article.get("source") else "Unknown",
-                                    "sentiment": "neutral"
-                                })
-                        return articles
-                    else:
-                        print(f"NewsAPI error: {response.status}")
-                        return self._mock_news()
+            session = await self._get_session()
+            async with session.get(url, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    articles = []
+                    for article in data.get("articles", []):
+                        if article.get("title"):  # Only include articles with titles
+                            articles.append({
+                                "title": article.get("title", ""),
+                                "description": article.get("description", ""),
+                                "url": article.get("url", ""),
+                                "published_at": article.get("publishedAt", ""),
+                                "source": article.get("source", {}).get("name", "Unknown") if article.get("source") else "Unknown",
+                                "sentiment": "neutral"
+                            })
+                    return articles
+                else:
+                    print(f"NewsAPI error: {response.status}")
+                    return self._mock_news()
         except Exception as e:
             print(f"NewsAPI error: {e}")
             return self._mock_news()
@@ -150,8 +219,7 @@ class BTCDataFetcher:
     
     async def get_market_data(self) -> Dict:
         """Get comprehensive BTC market data"""
-        price_data = await self.get_btc_price()
-        news_data = await self.get_btc_news()
+        price_data, news_data = await asyncio.gather(self.get_price(), self.get_news())
         
         return {
             "price": price_data,
@@ -161,9 +229,9 @@ class BTCDataFetcher:
         }
 
 async def main():
-    fetcher = BTCDataFetcher()
-    data = await fetcher.get_market_data()
-    print(json.dumps(data, indent=2))
+    async with BTCDataFetcher() as fetcher:
+        data = await fetcher.get_market_data()
+    print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
 
 if __name__ == "__main__":
     asyncio.run(main())
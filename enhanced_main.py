@@ -2,7 +2,7 @@ import asyncio
 import os
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from typing import List, Optional
@@ -40,6 +40,7 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown
     print("🛑 Shutting down enhanced system...")
+    await data_fetcher.close()
 
 app = FastAPI(
     title="Enhanced Multi-Crypto Advisory System",
@@ -293,7 +294,7 @@ async def get_advisory_recommendation():
         # For now, use the existing BTC agent
         # TODO: Enhance for multi-crypto recommendations
         recommendation = await agent.get_advisory_recommendation()
-        return JSONResponse(content=recommendation)
+        return ORJSONResponse(content=recommendation)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting recommendation: {str(e)}")
 
@@ -313,7 +314,7 @@ async def reset_portfolio(starting_cash: float = 10000.0):
 async def get_supported_cryptocurrencies():
     """Get list of supported cryptocurrencies"""
     return JSONResponse(content={
-        "supported_cryptocurrencies": data_fetcher.supported_cryptos,
+        "supported_cryptocurrencies": dict(data_fetcher.supported_cryptos),
         "count": len(data_fetcher.supported_cryptos)
     })
 
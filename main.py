@@ -2,7 +2,7 @@ import asyncio
 import os
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
@@ -26,10 +26,11 @@ async def lifespan(app: FastAPI):
     
     trader = VirtualTrader(starting_cash=10000.0)
     data_fetcher = BTCDataFetcher()
-    agent = SimpleBTCAgent(trader)
+    agent = SimpleBTCAgent(trader, data_fetcher)
     
     print("✅ System ready!")
-    yield
+    async with data_fetcher:
+        yield
     # Shutdown
     print("🛑 Shutting down...")
 
@@ -128,7 +129,7 @@ async def get_advisory_recommendation():
     """Get AI-powered trading recommendation"""
     try:
         recommendation = await agent.get_advisory_recommendation()
-        return JSONResponse(content=recommendation)
+        return ORJSONResponse(content=recommendation)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting recommendation: {str(e)}")
 
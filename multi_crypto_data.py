@@ -1,65 +1,149 @@
 import aiohttp
 import asyncio
+import ijson
+import itertools
 import json
 import os
+from collections import Counter
 from datetime import datetime
+from types import MappingProxyType
 from typing import Dict, List, Optional
+from asyncio_throttle import Throttler
+
+# NewsAPI responses larger than this (or without a Content-Length) are parsed incrementally
+NEWS_STREAM_THRESHOLD = 64 * 1024
+# How long a news request waits for NewsAPI budget before serving mock news instead;
+# once the daily quota is spent the throttler would otherwise block for up to a day
+NEWS_BUDGET_WAIT = 1.0
+
+# Supported cryptocurrencies (read-only, shared by every fetcher)
+SUPPORTED_CRYPTOS = MappingProxyType({
+    'BTC': {'coingecko_id': 'bitcoin', 'name': 'Bitcoin'},
+    'ETH': {'coingecko_id': 'ethereum', 'name': 'Ethereum'},
+    'SOL': {'coingecko_id': 'solana', 'name': 'Solana'},
+    'ADA': {'coingecko_id': 'cardano', 'name': 'Cardano'},
+    'DOT': {'coingecko_id': 'polkadot', 'name': 'Polkadot'},
+    'LINK': {'coingecko_id': 'chainlink', 'name': 'Chainlink'},
+    'MATIC': {'coingecko_id': 'matic-network', 'name': 'Polygon'},
+    'AVAX': {'coingecko_id': 'avalanche-2', 'name': 'Avalanche'}
+})
+
+# Lookups derived from SUPPORTED_CRYPTOS
+_GECKO_IDS_CSV = ','.join(info['coingecko_id'] for info in SUPPORTED_CRYPTOS.values())
+_GECKO_TO_SYMBOL = MappingProxyType({info['coingecko_id']: symbol for symbol, info in SUPPORTED_CRYPTOS.items()})
+_LOWER_INDEX = tuple((symbol, symbol.lower(), info['name'].lower()) for symbol, info in SUPPORTED_CRYPTOS.items())
+
+# Symbols searched when get_crypto_news is called without a list
+DEFAULT_NEWS_SYMBOLS = ('BTC', 'ETH', 'SOL', 'crypto')
+
+def _build_news_query(symbols) -> str:
+    """Build a NewsAPI query from crypto names and symbols"""
+    terms = (
+        term
+        for symbol in symbols
+        for term in ((SUPPORTED_CRYPTOS[symbol]['name'], symbol) if symbol in SUPPORTED_CRYPTOS else (symbol,))
+    )
+    return ' OR '.join(itertools.islice(terms, 10))  # Limit query length
+
+_DEFAULT_NEWS_QUERY = _build_news_query(DEFAULT_NEWS_SYMBOLS)
+
+# Fallback prices used when CoinGecko is unavailable
+MOCK_PRICES = {
+    'BTC': 45000,
+    'ETH': 2800,
+    'SOL': 95,
+    'ADA': 0.45,
+    'DOT': 6.2,
+    'LINK': 14.5,
+    'MATIC': 0.85,
+    'AVAX': 18.2
+}
+
+# Mock records are immutable apart from the timestamp, so build them once
+_MOCK_TEMPLATE = {
+    symbol: {
+        "symbol": symbol,
+        "name": SUPPORTED_CRYPTOS.get(symbol, {}).get('name', symbol),
+        "price": price,
+        "change_24h": (hash(symbol) % 20) - 10,  # Random change between -10 and 10
+        "market_cap": price * 1000000,
+        "volume_24h": price * 50000,
+        "source": "mock"
+    }
+    for symbol, price in MOCK_PRICES.items()
+}
 
 class MultiCryptoDataFetcher:
     def __init__(self):
         self.coindesk_api_key = os.getenv('COINDESK_API_KEY')
         self.newsapi_key = os.getenv('NEWSAPI_KEY')
+        self.supported_cryptos = SUPPORTED_CRYPTOS
         
-        # Supported cryptocurrencies
-        self.supported_cryptos = {
-            'BTC': {'coingecko_id': 'bitcoin', 'name': 'Bitcoin'},
-            'ETH': {'coingecko_id': 'ethereum', 'name': 'Ethereum'},
-            'SOL': {'coingecko_id': 'solana', 'name': 'Solana'},
-            'ADA': {'coingecko_id': 'cardano', 'name': 'Cardano'},
-            'DOT': {'coingecko_id': 'polkadot', 'name': 'Polkadot'},
-            'LINK': {'coingecko_id': 'chainlink', 'name': 'Chainlink'},
-            'MATIC': {'coingecko_id': 'matic-network', 'name': 'Polygon'},
-            'AVAX': {'coingecko_id': 'avalanche-2', 'name': 'Avalanche'}
-        }
+        # Client-side rate limits so bursts are spaced out instead of hitting 429s
+        self._cg_throttle = Throttler(rate_limit=10, period=60)  # CoinGecko free tier
+        self._news_throttle = Throttler(rate_limit=100, period=86400)  # NewsAPI developer plan
+        
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            # aiodns-backed resolver keeps DNS off the event loop; results are cached for 5 minutes
+            connector = aiohttp.TCPConnector(
+                limit=32,
+                limit_per_host=8,
+                ttl_dns_cache=300,
+                use_dns_cache=True,
+                resolver=aiohttp.AsyncResolver()
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+    
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
         
     async def get_crypto_prices(self, symbols: List[str] = None) -> Dict[str, Dict]:
         """Get current prices for multiple cryptocurrencies"""
         if not symbols:
-            symbols = list(self.supported_cryptos.keys())
-            
-        try:
+            # Default request: reuse the precomputed id list and reverse map
+            symbols = list(SUPPORTED_CRYPTOS)
+            coingecko_ids = _GECKO_IDS_CSV
+            symbol_map = _GECKO_TO_SYMBOL
+        else:
             # Get CoinGecko IDs for the symbols
-            coingecko_ids = []
-            symbol_map = {}
-            
-            for symbol in symbols:
-                if symbol in self.supported_cryptos:
-                    gecko_id = self.supported_cryptos[symbol]['coingecko_id']
-                    coingecko_ids.append(gecko_id)
-                    symbol_map[gecko_id] = symbol
+            symbol_map = {
+                SUPPORTED_CRYPTOS[symbol]['coingecko_id']: symbol
+                for symbol in symbols if symbol in SUPPORTED_CRYPTOS
+            }
+            coingecko_ids = ','.join(symbol_map)
             
+        try:
             if not coingecko_ids:
                 return {}
                 
-            ids_str = ','.join(coingecko_ids)
-            url = f"https://api.coingecko.com/api/v3/simple/price?ids={ids_str}&vs_currencies=usd&include_24hr_change=true&include_market_cap=true&include_24hr_vol=true"
+            url = f"https://api.coingecko.com/api/v3/simple/price?ids={coingecko_ids}&vs_currencies=usd&include_24hr_change=true&include_market_cap=true&include_24hr_vol=true"
             
-            async with aiohttp.ClientSession() as session:
+            session = await self._get_session()
+            async with self._cg_throttle:
                 async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
                     if response.status == 200:
                         data = await response.json()
+                        now = datetime.now().isoformat()
                         
                         result = {}
                         for gecko_id, price_data in data.items():
                             symbol = symbol_map[gecko_id]
                             result[symbol] = {
                                 "symbol": symbol,
-                                "name": self.supported_cryptos[symbol]['name'],
+                                "name": SUPPORTED_CRYPTOS[symbol]['name'],
                                 "price": price_data.get("usd", 0),
                                 "change_24h": price_data.get("usd_24h_change", 0),
                                 "market_cap": price_data.get("usd_market_cap", 0),
                                 "volume_24h": price_data.get("usd_24h_vol", 0),
-                                "timestamp": datetime.now().isoformat(),
+                                "timestamp": now,
                                 "source": "coingecko"
                             }
                         return result
@@ -72,45 +156,18 @@ class MultiCryptoDataFetcher:
     
     def _mock_crypto_prices(self, symbols: List[str]) -> Dict[str, Dict]:
         """Return mock price data for testing"""
-        mock_prices = {
-            'BTC': 45000,
-            'ETH': 2800,
-            'SOL': 95,
-            'ADA': 0.45,
-            'DOT': 6.2,
-            'LINK': 14.5,
-            'MATIC': 0.85,
-            'AVAX': 18.2
+        now = datetime.now().isoformat()
+        return {
+            symbol: {**_MOCK_TEMPLATE[symbol], "timestamp": now}
+            for symbol in symbols if symbol in _MOCK_TEMPLATE
         }
-        
-        result = {}
-        for symbol in symbols:
-            if symbol in mock_prices:
-                result[symbol] = {
-                    "symbol": symbol,
-                    "name": self.supported_cryptos.get(symbol, {}).get('name', symbol),
-                    "price": mock_prices[symbol],
-                    "change_24h": (hash(symbol) % 20) - 10,  # Random change between -10 and 10
-                    "market_cap": mock_prices[symbol] * 1000000,
-                    "volume_24h": mock_prices[symbol] * 50000,
-                    "timestamp": datetime.now().isoformat(),
-                    "source": "mock"
-                }
-        return result
     
     async def get_crypto_news(self, symbols: List[str] = None, limit: int = 20) -> List[Dict]:
         """Get crypto news for multiple currencies"""
-        if not symbols:
-            symbols = ['BTC', 'ETH', 'SOL', 'crypto']
-            
-        # Create search query
-        crypto_names = []
-        for symbol in symbols:
-            if symbol in self.supported_cryptos:
-                crypto_names.append(self.supported_cryptos[symbol]['name'])
-            crypto_names.append(symbol)
-        
-        search_query = ' OR '.join(crypto_names[:10])  # Limit query length
+        if not symbols or tuple(symbols) == DEFAULT_NEWS_SYMBOLS:
+            search_query = _DEFAULT_NEWS_QUERY
+        else:
+            search_query = _build_news_query(symbols)
         
         try:
             url = "https://newsapi.org/v2/everything"
@@ -123,47 +180,76 @@ class MultiCryptoDataFetcher:
             }
             headers = {"X-API-Key": self.newsapi_key}
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
+            try:
+                await asyncio.wait_for(self._news_throttle.acquire(), timeout=NEWS_BUDGET_WAIT)
+            except asyncio.TimeoutError:
+                print("NewsAPI request budget exhausted, using mock news")
+                return self._mock_crypto_news()
+            
+            session = await self._get_session()
+            async with session.get(url, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    articles = []
+                    if response.content_length is not None and response.content_length <= NEWS_STREAM_THRESHOLD:
                         data = await response.json()
-                        articles = []
-                        for article in data.get("articles", []):
-                            if article.get("title"):
-                                # Determine which crypto this article is about
-                                relevant_cryptos = []
-                                title_desc = (article.get("title", "") + " " + article.get("description", "")).lower()
-                                
-                                for symbol, info in self.supported_cryptos.items():
-                                    if symbol.lower() in title_desc or info['name'].lower() in title_desc:
-                                        relevant_cryptos.append(symbol)
-                                
-                                articles.append({
-                                    "title": article.get("title", ""),
-                                    "description": article.get("description", ""),
-                                    "url": article.get("url", ""),
-                                    "published_at": article.get("publishedAt", ""),
-                                    "source": article.get("source", {}).get("name", "Unknown") if article.get("source") else "Unknown",
-                                    "sentiment": self._analyze_sentiment(title_desc),
-                                    "relevant_cryptos": relevant_cryptos if relevant_cryptos else ["CRYPTO"]
-                                })
-                        return articles
+                        # Tag the whole batch off the event loop in a single worker hop
+                        articles = await asyncio.to_thread(self._parse_articles, data.get("articles", []))
                     else:
-                        print(f"NewsAPI error: {response.status}")
-                        return self._mock_crypto_news()
-                        
+                        # Stream articles as they arrive instead of materializing the whole payload
+                        async for article in ijson.items(response.content, "articles.item"):
+                            parsed = self._parse_article(article)
+                            if parsed:
+                                articles.append(parsed)
+                    return articles
+                else:
+                    print(f"NewsAPI error: {response.status}")
+                    return self._mock_crypto_news()
+                    
         except Exception as e:
             print(f"NewsAPI error: {e}")
             return self._mock_crypto_news()
     
+    def _parse_articles(self, raw_articles: List[Dict]) -> List[Dict]:
+        """Parse and tag a batch of raw NewsAPI articles"""
+        articles = []
+        for article in raw_articles:
+            parsed = self._parse_article(article)
+            if parsed:
+                articles.append(parsed)
+        return articles
+    
+    def _parse_article(self, article: Dict) -> Optional[Dict]:
+        """Convert a raw NewsAPI article into our news format"""
+        if not article.get("title"):
+            return None
+        
+        # Determine which crypto this article is about
+        relevant_cryptos = []
+        title_desc = (article.get("title", "") + " " + article.get("description", "")).lower()
+        
+        for symbol, symbol_lower, name_lower in _LOWER_INDEX:
+            if symbol_lower in title_desc or name_lower in title_desc:
+                relevant_cryptos.append(symbol)
+        
+        return {
+            "title": article.get("title", ""),
+            "description": article.get("description", ""),
+            "url": article.get("url", ""),
+            "published_at": article.get("publishedAt", ""),
+            "source": article.get("source", {}).get("name", "Unknown") if article.get("source") else "Unknown",
+            "sentiment": self._analyze_sentiment(title_desc),
+            "relevant_cryptos": relevant_cryptos if relevant_cryptos else ["CRYPTO"]
+        }
+    
     def _mock_crypto_news(self) -> List[Dict]:
         """Return mock news data for testing"""
+        now = datetime.now().isoformat()
         return [
             {
                 "title": "Bitcoin Reaches New All-Time High as Institutional Adoption Grows",
                 "description": "Major corporations continue to add Bitcoin to their treasury reserves",
                 "url": "https://example.com/btc-news-1",
-                "published_at": datetime.now().isoformat(),
+                "published_at": now,
                 "source": "Mock Crypto News",
                 "sentiment": "positive",
                 "relevant_cryptos": ["BTC"]
@@ -172,7 +258,7 @@ class MultiCryptoDataFetcher:
                 "title": "Ethereum 2.0 Staking Rewards Attract More Validators",
                 "description": "The transition to proof-of-stake continues to show promising results",
                 "url": "https://example.com/eth-news-1",
-                "published_at": datetime.now().isoformat(),
+                "published_at": now,
                 "source": "Mock Blockchain Times",
                 "sentiment": "positive",
                 "relevant_cryptos": ["ETH"]
@@ -181,7 +267,7 @@ class MultiCryptoDataFetcher:
                 "title": "Solana Network Experiences Brief Outage, Recovery Underway",
                 "description": "Technical issues cause temporary disruption to the Solana blockchain",
                 "url": "https://example.com/sol-news-1",
-                "published_at": datetime.now().isoformat(),
+                "published_at": now,
                 "source": "Mock DeFi Daily",
                 "sentiment": "negative",
                 "relevant_cryptos": ["SOL"]
@@ -190,7 +276,7 @@ class MultiCryptoDataFetcher:
                 "title": "Regulatory Clarity Boosts Cryptocurrency Market Confidence",
                 "description": "New guidelines provide clearer framework for digital asset operations",
                 "url": "https://example.com/crypto-news-1",
-                "published_at": datetime.now().isoformat(),
+                "published_at": now,
                 "source": "Mock Regulatory Watch",
                 "sentiment": "positive",
                 "relevant_cryptos": ["BTC", "ETH", "ADA"]
@@ -220,11 +306,11 @@ class MultiCryptoDataFetcher:
         total_market_cap = sum(crypto.get("market_cap", 0) for crypto in prices.values())
         
         # Sentiment analysis
-        sentiment_counts = {"positive": 0, "negative": 0, "neutral": 0}
-        for article in news:
-            sentiment_counts[article["sentiment"]] += 1
+        # Seeded so every bucket is present and ties resolve positive > negative > neutral
+        sentiment_counts = Counter({"positive": 0, "negative": 0, "neutral": 0})
+        sentiment_counts.update(article["sentiment"] for article in news)
         
-        overall_sentiment = max(sentiment_counts, key=sentiment_counts.get)
+        overall_sentiment = sentiment_counts.most_common(1)[0][0] if news else "neutral"
         
         return {
             "prices": prices,
@@ -233,7 +319,7 @@ class MultiCryptoDataFetcher:
                 "total_market_cap": total_market_cap,
                 "tracked_assets": len(prices),
                 "news_sentiment": overall_sentiment,
-                "sentiment_breakdown": sentiment_counts
+                "sentiment_breakdown": dict(sentiment_counts)
             },
             "timestamp": datetime.now().isoformat(),
             "supported_cryptos": list(self.supported_cryptos.keys())
@@ -264,6 +350,8 @@ async def main():
     print(f"  Total Market Cap: ${market_data['market_metrics']['total_market_cap']:,.0f}")
     print(f"  Overall Sentiment: {market_data['market_metrics']['news_sentiment']}")
     print(f"  Supported Assets: {', '.join(market_data['supported_cryptos'])}")
+    
+    await fetcher.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,5 +1,6 @@
 import json
 import uuid
+import numpy as np
 from datetime import datetime
 from typing import Dict, List, Optional
 from dataclasses import dataclass, asdict
@@ -44,6 +45,10 @@ class MultiCryptoTrader:
         self.orders = []  # List of Order objects
         self.trade_history = []
         
+        # Positions marked at their last fill price, maintained incrementally on fills
+        self._marks = {}  # symbol -> last fill price
+        self._cached_position_value = 0.0
+        
         # Trading parameters
         self.max_position_pct = 0.3  # Max 30% in any single asset
         self.max_total_exposure = 0.8  # Max 80% invested
@@ -54,7 +59,9 @@ class MultiCryptoTrader:
         positions = []
         total_position_value = 0.0
         total_pnl = 0.0
-        position_values = {}
+        market_values = []
+        largest_position = "None"
+        largest_value = float("-inf")
         
         for symbol, pos in self.positions.items():
             if pos["quantity"] != 0 and symbol in current_prices:
@@ -75,15 +82,17 @@ class MultiCryptoTrader:
                 positions.append(position)
                 total_position_value += market_value
                 total_pnl += pnl
-                position_values[symbol] = market_value
+                market_values.append(market_value)
+                if market_value > largest_value:
+                    largest_value = market_value
+                    largest_position = symbol
         
         total_value = self.cash + total_position_value
         total_pnl_overall = total_value - self.starting_cash
         total_pnl_pct = (total_pnl_overall / self.starting_cash) * 100 if self.starting_cash > 0 else 0
         
         # Calculate diversification metrics
-        largest_position = max(position_values, key=position_values.get) if position_values else "None"
-        diversification_score = self._calculate_diversification_score(position_values, total_position_value)
+        diversification_score = self._calculate_diversification_score(market_values, total_position_value)
         
         return Portfolio(
             cash=self.cash,
@@ -96,13 +105,14 @@ class MultiCryptoTrader:
             diversification_score=diversification_score
         )
     
-    def _calculate_diversification_score(self, position_values: Dict[str, float], total_value: float) -> float:
+    def _calculate_diversification_score(self, position_values: List[float], total_value: float) -> float:
         """Calculate diversification score (0-100, higher is more diversified)"""
         if not position_values or total_value == 0:
             return 0.0
         
-        # Calculate Herfindahl-Hirschman Index (HHI)
-        hhi = sum((value / total_value) ** 2 for value in position_values.values())
+        # Calculate Herfindahl-Hirschman Index (HHI): sum(v^2) / total^2
+        values = np.fromiter(position_values, dtype=np.float64, count=len(position_values))
+        hhi = float((values * values).sum()) / (total_value * total_value)
         
         # Convert to diversification score (inverse of concentration)
         max_hhi = 1.0  # Maximum concentration (all in one asset)
@@ -110,8 +120,13 @@ class MultiCryptoTrader:
         
         return max(0, min(100, diversification_score))
     
-    def place_order(self, symbol: str, side: str, quantity: float, price: float, order_type: str = "market") -> Dict:
-        """Place a virtual order with enhanced validation"""
+    def place_order(self, symbol: str, side: str, quantity: float, price: float, order_type: str = "market",
+                    current_prices: Optional[Dict[str, Dict]] = None) -> Dict:
+        """Place a virtual order with enhanced validation
+        
+        When current_prices is given, the position-size check marks every holding
+        at its quoted price; otherwise it uses the cached last-fill valuation.
+        """
         order_id = str(uuid.uuid4())[:8]
         
         # Calculate trade value
@@ -140,9 +155,17 @@ class MultiCryptoTrader:
                 current_position_value = self.positions[symbol]["quantity"] * price
             
             new_position_value = current_position_value + trade_value
-            total_portfolio_value = self.cash + sum(
-                pos["quantity"] * price for pos in self.positions.values()
-            )
+            if current_prices:
+                position_value = sum(
+                    pos["quantity"] * (current_prices[s]["price"] if s in current_prices else self._marks.get(s, pos["avg_price"]))
+                    for s, pos in self.positions.items()
+                )
+            else:
+                # Last-fill valuation, re-marked at the order price for this symbol
+                position_value = self._cached_position_value
+                if symbol in self.positions:
+                    position_value += self.positions[symbol]["quantity"] * (price - self._marks.get(symbol, price))
+            total_portfolio_value = self.cash + position_value
             
             position_pct = new_position_value / (total_portfolio_value + trade_value)
             if position_pct > self.max_position_pct:
@@ -189,6 +212,8 @@ class MultiCryptoTrader:
     def _execute_order(self, order: Order) -> Dict:
         """Execute a virtual order with enhanced tracking"""
         try:
+            old_quantity = self.positions.get(order.symbol, {}).get("quantity", 0.0)
+            
             if order.side == "buy":
                 # Buy order
                 cost = order.quantity * order.price
@@ -220,6 +245,8 @@ class MultiCryptoTrader:
                     if self.positions[order.symbol]["quantity"] <= 0.000001:
                         del self.positions[order.symbol]
             
+            self._update_cached_position_value(order.symbol, old_quantity, order.price)
+            
             # Update order status
             order.status = "filled"
             
@@ -251,6 +278,16 @@ class MultiCryptoTrader:
                 "order_id": order.id
             }
     
+    def _update_cached_position_value(self, symbol: str, old_quantity: float, price: float):
+        """Re-mark one position at its latest fill price and adjust the cached total"""
+        new_quantity = self.positions[symbol]["quantity"] if symbol in self.positions else 0.0
+        self._cached_position_value += new_quantity * price - old_quantity * self._marks.get(symbol, price)
+        
+        if new_quantity:
+            self._marks[symbol] = price
+        else:
+            self._marks.pop(symbol, None)
+    
     def get_position_analysis(self, current_prices: Dict[str, Dict]) -> Dict:
         """Get detailed position analysis"""
         portfolio = self.get_portfolio(current_prices)
@@ -308,6 +345,8 @@ class MultiCryptoTrader:
         self.positions = {}
         self.orders = []
         self.trade_history = []
+        self._marks = {}
+        self._cached_position_value = 0.0
     
     def rebalance_suggestions(self, current_prices: Dict[str, Dict], target_allocations: Dict[str, float] = None) -> List[Dict]:
         """Suggest rebalancing trades"""
@@ -5,6 +5,8 @@ import sys
 import argparse
 from src.agent_nodes import TradingAgent
 from src.database import init_database, create_tables
+from src.log_queue import start_drainer
+from src.log_setup import setup_logging, stop_logging
 
 
 async def run_agent(user_id: int, instrument: str = "XBX-USD", interval: int = 300):
@@ -17,6 +19,7 @@ async def run_agent(user_id: int, instrument: str = "XBX-USD", interval: int = 3
         await init_database()
         await create_tables()
         print("Database initialized")
+        start_drainer()
         
         agent = TradingAgent(user_id, instrument)
         await agent.run_continuous(interval)
@@ -36,7 +39,16 @@ def main():
     
     args = parser.parse_args()
     
-    asyncio.run(run_agent(args.user_id, args.instrument, args.interval))
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass  # uvloop is unavailable on Windows; fall back to the default loop
+    setup_logging()
+    try:
+        asyncio.run(run_agent(args.user_id, args.instrument, args.interval))
+    finally:
+        stop_logging()
 
 
 if __name__ == "__main__":
@@ -1,17 +1,18 @@
 #!/usr/bin/env python3
 
-import sys
-import os
-sys.path.append('/Users/kousthubhveturi/fintech-agent')
-sys.path.append('/Users/kousthubhveturi/fintech-agent/python')
-
-os.chdir('/Users/kousthubhveturi/fintech-agent/python')
-
-from dotenv import load_dotenv
-load_dotenv()
+from src.bootstrap import init
+ROOT = init()
 
 import asyncio
+import logging
 from src.langgraph_agent import LangGraphTradingAgent
+from src.log_setup import CRASH_LOGGER, setup_logging, stop_logging
+
+logger = logging.getLogger("trading_system")
+# Fatal errors go to a file only, so their tracebacks never interleave with cycle logs
+crash_logger = logging.getLogger(CRASH_LOGGER)
+
+ERROR_LOG_PATH = ROOT / "trading_system_errors.log"
 
 async def run_trading_system():
     print("Starting FinTech Trading Agent System...")
@@ -25,58 +26,68 @@ async def run_trading_system():
     print(f"Mode: Paper Trading")
     print("=" * 50)
     
+    agent = None
     try:
         agent = LangGraphTradingAgent(user_id=user_id, instrument=instrument)
         print("✓ LangGraph Trading Agent initialized")
         
-        print("\nRunning trading cycles...")
+        agent.start_tick_listener()
+        print("✓ Ticker stream listening for price moves")
+        
+        print("\nRunning trading cycles (one JSON log line per cycle, next cycle on a price move or after 5 minutes)...")
         print("Press Ctrl+C to stop")
         print("-" * 30)
         
         cycle_count = 0
         while True:
             cycle_count += 1
-            print(f"\n[Cycle {cycle_count}] Starting...")
             
             try:
                 result = await agent.execute_cycle()
                 
-                if result.get('success'):
-                    print(f"[Cycle {cycle_count}] ✓ Completed successfully")
-                    action = result.get('state', {}).get('action', {})
-                    if action.get('executed'):
-                        print(f"[Cycle {cycle_count}] 🎯 Trade executed!")
-                        fills = action.get('fills', [])
-                        if fills:
-                            fill = fills[0]
-                            print(f"[Cycle {cycle_count}] Price: ${fill.get('price', 0):.2f}")
-                            print(f"[Cycle {cycle_count}] Quantity: {fill.get('quantity', 0):.6f}")
-                else:
-                    print(f"[Cycle {cycle_count}] ⚠ Completed with issues")
-                
                 state = result.get('state', {})
+                action = state.get('action', {})
                 decision = state.get('decision', {})
-                print(f"[Cycle {cycle_count}] Decision: {decision.get('action', 'hold')}")
-                print(f"[Cycle {cycle_count}] Confidence: {decision.get('confidence', 0):.2f}")
-                
                 portfolio = state.get('portfolio', {})
-                if portfolio:
-                    print(f"[Cycle {cycle_count}] Cash: ${portfolio.get('cash_balance', 0):.2f}")
-                    print(f"[Cycle {cycle_count}] Total Value: ${portfolio.get('total_value', 0):.2f}")
-                    print(f"[Cycle {cycle_count}] P&L: {portfolio.get('pnl_pct', 0):.2f}%")
+                fill = (action.get('fills') or [{}])[0]
+                
+                logger.info("cycle", extra={
+                    "cycle": cycle_count,
+                    "success": bool(result.get('success')),
+                    "decision": decision.get('action', 'hold'),
+                    "confidence": decision.get('confidence', 0),
+                    "executed": bool(action.get('executed')),
+                    "price": fill.get('price'),
+                    "quantity": fill.get('quantity'),
+                    "cash": portfolio.get('cash_balance'),
+                    "total_value": portfolio.get('total_value'),
+                    "pnl_pct": portfolio.get('pnl_pct'),
+                    "decision_lag": agent.get_decision_lag(),
+                    "execution_lag": agent.get_execution_lag(),
+                })
                 
-            except Exception as e:
-                print(f"[Cycle {cycle_count}] ✗ Error: {e}")
+            except Exception:
+                logger.exception("cycle_error", extra={"cycle": cycle_count})
             
-            print(f"[Cycle {cycle_count}] Waiting 5 minutes...")
-            await asyncio.sleep(300)
+            await agent.wait_for_tick(timeout=300)
             
     except KeyboardInterrupt:
         print("\n\nTrading system stopped by user")
     except Exception as e:
-        print(f"\n✗ System error: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"\n✗ System error: {e} (traceback in {ERROR_LOG_PATH})")
+        crash_logger.exception("system_error")
+    finally:
+        if agent is not None:
+            await agent.stop_tick_listener()
 
 if __name__ == "__main__":
-    asyncio.run(run_trading_system())
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass  # uvloop is unavailable on Windows; fall back to the default loop
+    setup_logging(ERROR_LOG_PATH)
+    try:
+        asyncio.run(run_trading_system())
+    finally:
+        stop_logging()
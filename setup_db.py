@@ -1,17 +1,10 @@
 #!/usr/bin/env python3
 
-import sys
-import os
-sys.path.append('/Users/kousthubhveturi/fintech-agent')
-sys.path.append('/Users/kousthubhveturi/fintech-agent/python')
-
-os.chdir('/Users/kousthubhveturi/fintech-agent/python')
-
-from dotenv import load_dotenv
-load_dotenv()
+from src.bootstrap import init
+init()
 
 import asyncio
-from src.database import init_database, create_tables
+from src.database import init_database, ensure_schema, close_database
 
 async def setup_database():
     print("Setting up database...")
@@ -19,8 +12,10 @@ async def setup_database():
         await init_database()
         print("✓ Database initialized")
         
-        await create_tables()
-        print("✓ Tables created")
+        if await ensure_schema():
+            print("✓ Tables created")
+        else:
+            print("✓ Schema already up to date")
         
         print("\nDatabase setup complete!")
         
@@ -28,6 +23,13 @@ async def setup_database():
         print(f"✗ Database setup failed: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        await close_database()
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass  # uvloop is unavailable on Windows; fall back to the default loop
     asyncio.run(setup_database())
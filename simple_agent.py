@@ -1,12 +1,40 @@
+import ahocorasick
 import asyncio
 import json
-from datetime import datetime
+import time
+from bisect import bisect_right
+from itertools import accumulate
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
 from typing import Dict, List, Optional
-from dataclasses import dataclass
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from functools import lru_cache, wraps
 
+from agent_kernels import ACTION_NAMES, HAVE_NUMBA, decide, vectorized_decide
 from btc_data import BTCDataFetcher
 from virtual_trader import VirtualTrader
 
+# Trend buckets: a price above _BUCKETS[i-1] and at most _BUCKETS[i] maps to _LABELS[i]
+_BUCKETS = np.array([20000, 30000, 50000, 80000, 100000], dtype=np.float64)
+_LABELS = np.array(["very_bearish", "bearish", "neutral", "neutral_bullish", "bullish", "very_bullish"])
+
+_POS = frozenset({"surge", "bull", "rally", "gain", "rise", "up", "positive", "growth", "strong", "performance"})
+_NEG = frozenset({"crash", "bear", "drop", "fall", "decline", "down", "negative", "loss", "volatility", "uncertainty"})
+
+def _build_sentiment_automaton() -> ahocorasick.Automaton:
+    """Single automaton that finds every sentiment keyword in one pass over the text"""
+    automaton = ahocorasick.Automaton()
+    for word in _POS:
+        automaton.add_word(word, ("pos", word))
+    for word in _NEG:
+        automaton.add_word(word, ("neg", word))
+    automaton.make_automaton()
+    return automaton
+
+_SENTIMENT_AC = _build_sentiment_automaton()
+
 @dataclass
 class TradingRecommendation:
     action: str  # buy, sell, hold
@@ -18,11 +46,80 @@ class TradingRecommendation:
     target_price: Optional[float] = None
     stop_loss: Optional[float] = None
 
+# (epoch second, ISO string) of the last formatted timestamp
+_last_iso = (-1, "")
+
+def _iso_timestamp(timestamp_ns: int) -> str:
+    """UTC ISO-8601 string at second resolution, reformatted only when the second changes"""
+    global _last_iso
+    sec = timestamp_ns // 1_000_000_000
+    if sec != _last_iso[0]:
+        _last_iso = (sec, datetime.fromtimestamp(sec, tz=timezone.utc).isoformat())
+    return _last_iso[1]
+
+def timed(name: str):
+    """Record each call's duration in nanoseconds into the agent's per-stage ring buffer"""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(self, *args, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return await fn(self, *args, **kwargs)
+                finally:
+                    self._latencies[name].append(time.perf_counter_ns() - start)
+            return async_wrapper
+        
+        @wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return fn(self, *args, **kwargs)
+            finally:
+                self._latencies[name].append(time.perf_counter_ns() - start)
+        return wrapper
+    return decorator
+
+@dataclass(frozen=True)
+class RecommendationTemplate:
+    """Price-independent part of a recommendation, shared across identical market states"""
+    action: str
+    size_fraction: float  # of cash for buys, of the BTC position for sells
+    confidence: float
+    risk_level: str
+    reasoning: str  # format string filled with live values by the caller
+
+@lru_cache(maxsize=1024)
+def _decide(sentiment: str, has_position: bool, cash_over_1k: bool, pnl_over_1k: bool) -> RecommendationTemplate:
+    """Decision rules for make_recommendation, memoized on the inputs they branch on"""
+    if not has_position and sentiment == "positive" and cash_over_1k:
+        return RecommendationTemplate(
+            "buy", 0.2, 0.7, "medium",
+            "Positive sentiment ({sentiment}) with ${cash:,.2f} available cash. Allocating ${amount:,.2f} (20% of cash)."
+        )
+    elif has_position and sentiment == "negative":
+        return RecommendationTemplate(
+            "sell", 0.5, 0.6, "low",
+            "Negative sentiment ({sentiment}) suggests taking profits. Selling 50% of position ({quantity:.6f} BTC)."
+        )
+    elif has_position and pnl_over_1k:
+        return RecommendationTemplate(
+            "sell", 0.3, 0.8, "low",
+            "Portfolio showing good profits (${pnl:,.2f}). Taking 30% profits."
+        )
+    return RecommendationTemplate(
+        "hold", 0.0, 0.5, "low",
+        "Mixed signals (sentiment: {sentiment}, has_position: {has_position}, cash: ${cash:,.2f}). Waiting for clearer opportunity."
+    )
+
 class SimpleBTCAgent:
-    def __init__(self, trader: VirtualTrader):
+    def __init__(self, trader: VirtualTrader, data_fetcher: Optional[BTCDataFetcher] = None):
         self.trader = trader
-        self.data_fetcher = BTCDataFetcher()
+        self.data_fetcher = data_fetcher or BTCDataFetcher()
+        self._latencies = defaultdict(lambda: deque(maxlen=1024))  # stage -> recent durations (ns)
+
     
+    @timed("collect_data")
     async def collect_data(self) -> Dict:
         """Step 1: Collect market data and portfolio info"""
         print("📊 Collecting market data...")
@@ -41,21 +138,12 @@ class SimpleBTCAgent:
                 "total_value": portfolio.total_value,
                 "total_pnl": portfolio.total_pnl,
                 "total_pnl_pct": portfolio.total_pnl_pct,
-                "positions": [
-                    {
-                        "symbol": pos.symbol,
-                        "quantity": pos.quantity,
-                        "avg_price": pos.avg_price,
-                        "current_price": pos.current_price,
-                        "pnl": pos.pnl,
-                        "pnl_pct": pos.pnl_pct
-                    }
-                    for pos in portfolio.positions
-                ]
+                "positions_by_symbol": portfolio.positions_by_symbol
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp_ns": time.time_ns()
         }
     
+    @timed("analyze_market")
     def analyze_market(self, data: Dict) -> Dict:
         """Step 2: Analyze market conditions"""
         print("🔍 Analyzing market conditions...")
@@ -75,25 +163,26 @@ class SimpleBTCAgent:
             "volume": "normal"
         }
         
+        # Label a whole price history in one call when the caller supplies one
+        price_history = market_data.get("price_history")
+        if price_history is not None and len(price_history):
+            analysis["trend_history"] = self._determine_trend_batch(price_history).tolist()
+        
         return analysis
     
+    @timed("assess_portfolio")
     def assess_portfolio(self, data: Dict, analysis: Dict) -> Dict:
         """Step 3: Assess current portfolio position"""
         print("💼 Assessing portfolio...")
         
         portfolio = data["portfolio"]
         
-        # Find BTC position
-        btc_position = None
-        for pos in portfolio["positions"]:
-            if pos["symbol"] == "BTC-USD":
-                btc_position = pos
-                break
+        btc_position = portfolio["positions_by_symbol"].get("BTC-USD")
         
         portfolio_analysis = {
             "has_btc_position": btc_position is not None,
-            "btc_quantity": btc_position["quantity"] if btc_position else 0.0,
-            "btc_pnl": btc_position["pnl"] if btc_position else 0.0,
+            "btc_quantity": btc_position.quantity if btc_position else 0.0,
+            "btc_pnl": btc_position.pnl if btc_position else 0.0,
             "cash_available": portfolio["cash"],
             "portfolio_exposure": (portfolio["total_value"] - portfolio["cash"]) / portfolio["total_value"] if portfolio["total_value"] > 0 else 0,
             "risk_capacity": "high" if portfolio["cash"] > 5000 else "medium" if portfolio["cash"] > 1000 else "low"
@@ -101,6 +190,7 @@ class SimpleBTCAgent:
         
         return portfolio_analysis
     
+    @timed("make_recommendation")
     def make_recommendation(self, analysis: Dict, portfolio_analysis: Dict) -> TradingRecommendation:
         """Step 4: Make trading recommendation"""
         print("🎯 Making recommendation...")
@@ -110,83 +200,76 @@ class SimpleBTCAgent:
         has_position = portfolio_analysis["has_btc_position"]
         cash_available = portfolio_analysis["cash_available"]
         
-        # Simple decision logic
-        if not has_position and sentiment == "positive" and cash_available > 1000:
-            # Buy signal
-            buy_amount = min(cash_available * 0.2, 2000)  # 20% of cash or $2000 max
-            quantity = buy_amount / current_price
-            
-            return TradingRecommendation(
-                action="buy",
-                symbol="BTC-USD",
-                quantity=quantity,
-                confidence=0.7,
-                reasoning=f"Positive sentiment ({sentiment}) with ${cash_available:,.2f} available cash. Allocating ${buy_amount:,.2f} (20% of cash).",
-                risk_level="medium",
-                target_price=current_price * 1.1,
-                stop_loss=current_price * 0.95
-            )
-        
-        elif has_position and sentiment == "negative":
-            # Sell signal
-            btc_quantity = portfolio_analysis["btc_quantity"]
-            sell_quantity = btc_quantity * 0.5  # Sell half
-            
-            return TradingRecommendation(
-                action="sell",
-                symbol="BTC-USD",
-                quantity=sell_quantity,
-                confidence=0.6,
-                reasoning=f"Negative sentiment ({sentiment}) suggests taking profits. Selling 50% of position ({sell_quantity:.6f} BTC).",
-                risk_level="low"
-            )
-        
-        elif has_position and portfolio_analysis["btc_pnl"] > 1000:
-            # Take profits if up significantly
-            btc_quantity = portfolio_analysis["btc_quantity"]
-            sell_quantity = btc_quantity * 0.3  # Sell 30%
-            
-            return TradingRecommendation(
-                action="sell",
-                symbol="BTC-USD",
-                quantity=sell_quantity,
-                confidence=0.8,
-                reasoning=f"Portfolio showing good profits (${portfolio_analysis['btc_pnl']:,.2f}). Taking 30% profits.",
-                risk_level="low"
-            )
+        btc_pnl = portfolio_analysis["btc_pnl"]
+        template = _decide(sentiment, has_position, cash_available > 1000, btc_pnl > 1000)
         
+        # Fill in the live, price-dependent parts
+        target_price = stop_loss = None
+        if template.action == "buy":
+            amount = min(cash_available * template.size_fraction, 2000)  # 20% of cash or $2000 max
+            quantity = amount / current_price
+            target_price = current_price * 1.1
+            stop_loss = current_price * 0.95
         else:
-            # Hold signal
-            return TradingRecommendation(
-                action="hold",
-                symbol="BTC-USD",
-                quantity=0.0,
-                confidence=0.5,
-                reasoning=f"Mixed signals (sentiment: {sentiment}, has_position: {has_position}, cash: ${cash_available:,.2f}). Waiting for clearer opportunity.",
-                risk_level="low"
-            )
+            amount = 0.0
+            quantity = portfolio_analysis["btc_quantity"] * template.size_fraction
+        
+        return TradingRecommendation(
+            action=template.action,
+            symbol="BTC-USD",
+            quantity=quantity,
+            confidence=template.confidence,
+            reasoning=template.reasoning.format(
+                sentiment=sentiment, has_position=has_position, cash=cash_available,
+                amount=amount, quantity=quantity, pnl=btc_pnl
+            ),
+            risk_level=template.risk_level,
+            target_price=target_price,
+            stop_loss=stop_loss
+        )
+    
+    def latency_report(self) -> Dict[str, Dict]:
+        """Per-stage latency summary in microseconds over the recent calls"""
+        report = {}
+        for name, samples in self._latencies.items():
+            values = np.fromiter(samples, dtype=np.float64, count=len(samples)) / 1000.0
+            report[name] = {
+                "count": len(values),
+                "mean_us": float(values.mean()),
+                "p50_us": float(np.percentile(values, 50)),
+                "p95_us": float(np.percentile(values, 95)),
+                "max_us": float(values.max())
+            }
+        return report
+    
+    def decision_cache_info(self):
+        """Hit/miss counters for the memoized decision rules"""
+        return _decide.cache_info()
     
-    def explain_decision(self, data: Dict, analysis: Dict, portfolio_analysis: Dict, recommendation: TradingRecommendation) -> str:
+    @timed("explain_decision")
+    def explain_decision(self, data: Dict, analysis: Dict, portfolio_analysis: Dict, recommendation: TradingRecommendation) -> Dict:
         """Step 5: Explain the decision reasoning"""
         print("📝 Generating explanation...")
         
-        reasoning_parts = [
-            f"Current BTC price: ${analysis['current_price']:,.2f} ({analysis['price_source']})",
-            f"News sentiment: {analysis['news_sentiment']} ({analysis['news_count']} articles)",
-            f"Portfolio cash: ${portfolio_analysis['cash_available']:,.2f}",
-            f"Current BTC position: {portfolio_analysis['btc_quantity']:.6f} BTC"
-        ]
+        explanation = {
+            "current_price": analysis["current_price"],
+            "price_source": analysis["price_source"],
+            "news_sentiment": analysis["news_sentiment"],
+            "news_count": analysis["news_count"],
+            "cash_available": portfolio_analysis["cash_available"],
+            "btc_quantity": portfolio_analysis["btc_quantity"],
+            "action": recommendation.action,
+            "confidence": recommendation.confidence,
+            "risk_level": recommendation.risk_level,
+            "reasoning": recommendation.reasoning
+        }
         
         if portfolio_analysis["has_btc_position"]:
-            reasoning_parts.append(f"BTC P&L: ${portfolio_analysis['btc_pnl']:,.2f}")
-        
-        reasoning_parts.append(f"Action: {recommendation.action.upper()}")
-        reasoning_parts.append(f"Confidence: {recommendation.confidence:.0%}")
-        reasoning_parts.append(f"Risk level: {recommendation.risk_level}")
-        reasoning_parts.append(f"Reasoning: {recommendation.reasoning}")
+            explanation["btc_pnl"] = portfolio_analysis["btc_pnl"]
         
-        return " | ".join(reasoning_parts)
+        return explanation
     
+    @timed("get_advisory_recommendation")
     async def get_advisory_recommendation(self) -> Dict:
         """Get complete advisory recommendation"""
         # Step 1: Collect data
@@ -217,27 +300,24 @@ class SimpleBTCAgent:
             },
             "explanation": explanation,
             "market_data": data["market_data"],
-            "portfolio": data["portfolio"],
+            "portfolio": self._portfolio_payload(data["portfolio"]),
             "analysis": analysis,
             "portfolio_analysis": portfolio_analysis,
-            "timestamp": data["timestamp"]
+            "timestamp": _iso_timestamp(data["timestamp_ns"])
         }
     
+    def _portfolio_payload(self, portfolio: Dict) -> Dict:
+        """Portfolio snapshot with positions as a list of dicts for JSON output"""
+        payload = {key: value for key, value in portfolio.items() if key != "positions_by_symbol"}
+        payload["positions"] = [asdict(position) for position in portfolio["positions_by_symbol"].values()]
+        return payload
+    
     def _analyze_news_sentiment(self, news: List[Dict]) -> str:
         """Simple news sentiment analysis"""
         if not news:
             return "neutral"
         
-        positive_words = ["surge", "bull", "rally", "gain", "rise", "up", "positive", "growth", "strong", "performance"]
-        negative_words = ["crash", "bear", "drop", "fall", "decline", "down", "negative", "loss", "volatility", "uncertainty"]
-        
-        positive_count = 0
-        negative_count = 0
-        
-        for article in news[:5]:  # Check top 5 articles
-            title = (article.get("title", "") + " " + article.get("description", "")).lower()
-            positive_count += sum(1 for word in positive_words if word in title)
-            negative_count += sum(1 for word in negative_words if word in title)
+        positive_count, negative_count = self._sentiment_counts(news)
         
         if positive_count > negative_count:
             return "positive"
@@ -245,34 +325,68 @@ class SimpleBTCAgent:
             return "negative"
         return "neutral"
     
+    def _sentiment_counts(self, news: List[Dict]) -> tuple:
+        """Count positive and negative keyword hits in the top 5 articles"""
+        # Scan the top 5 articles as one corpus; each keyword counts once per article.
+        # Lowercase before measuring offsets, since lower() can change a string's length
+        texts = [(article.get("title", "") + " " + article.get("description", "")).lower() for article in news[:5]]
+        starts = list(accumulate((len(text) + 1 for text in texts[:-1]), initial=0))
+        corpus = "\n".join(texts)
+        
+        hits = {(bisect_right(starts, end) - 1, value) for end, value in _SENTIMENT_AC.iter(corpus)}
+        positive_count = sum(1 for _, (tag, _) in hits if tag == "pos")
+        negative_count = len(hits) - positive_count
+        
+        return positive_count, negative_count
+    
+    def backtest(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Replay recommendations over a history of snapshots.
+        
+        Expects columns price, cash, btc_quantity, btc_pnl and news (a list of
+        articles per row); returns a copy with action, quantity and confidence.
+        """
+        counts = np.array([self._sentiment_counts(news or []) for news in df["news"]], dtype=np.int32).reshape(-1, 2)
+        prices = df["price"].to_numpy(dtype=np.float64)
+        cash = df["cash"].to_numpy(dtype=np.float64)
+        qty = df["btc_quantity"].to_numpy(dtype=np.float64)
+        pnl = df["btc_pnl"].to_numpy(dtype=np.float64)
+        
+        if HAVE_NUMBA:
+            pos = np.ascontiguousarray(counts[:, 0])
+            neg = np.ascontiguousarray(counts[:, 1])
+            actions, quantities, confidence = decide(pos, neg, prices, cash, qty, pnl)
+        else:
+            # Without numba, NumPy masks beat the interpreted kernel loop
+            sentiments = np.sign(counts[:, 0] - counts[:, 1])
+            actions, quantities, confidence = vectorized_decide(prices, sentiments, cash, qty, pnl)
+        
+        result = df.copy()
+        result["action"] = np.asarray(ACTION_NAMES)[actions]
+        result["quantity"] = quantities
+        result["confidence"] = confidence
+        return result
+    
     def _determine_trend(self, price: float) -> str:
         """Simple trend determination"""
-        if price > 100000:
-            return "very_bullish"
-        elif price > 80000:
-            return "bullish"
-        elif price > 50000:
-            return "neutral_bullish"
-        elif price > 30000:
-            return "neutral"
-        elif price > 20000:
-            return "bearish"
-        else:
-            return "very_bearish"
+        return str(_LABELS[np.searchsorted(_BUCKETS, price)])
+    
+    def _determine_trend_batch(self, prices: np.ndarray) -> np.ndarray:
+        """Trend labels for an array of prices"""
+        return _LABELS[np.searchsorted(_BUCKETS, np.asarray(prices, dtype=np.float64))]
 
 # Example usage
 async def main():
     # Create virtual trader with $10k
     trader = VirtualTrader(10000.0)
     
-    # Create advisory agent
-    agent = SimpleBTCAgent(trader)
-    
     # Get recommendation
     print("🤖 BTC Advisory Agent Starting...")
     print("="*60)
     
-    recommendation_data = await agent.get_advisory_recommendation()
+    # Create advisory agent on a fetcher whose HTTP session lives for the whole run
+    async with BTCDataFetcher() as data_fetcher:
+        agent = SimpleBTCAgent(trader, data_fetcher)
+        recommendation_data = await agent.get_advisory_recommendation()
     
     print("\n" + "="*60)
     print("🎯 ADVISORY RECOMMENDATION")
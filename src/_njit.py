@@ -0,0 +1,10 @@
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+    # nogil lets the compiled loops run in parallel from worker threads
+    jit = njit(cache=True, fastmath=True, nogil=True)
+except ImportError:  # numba is optional; the loops still run as plain Python
+    HAVE_NUMBA = False
+
+    def jit(func):
+        return func
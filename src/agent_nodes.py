@@ -1,47 +1,154 @@
 import asyncio
+import time
 import json
+import numpy as np
 from typing import Dict, List, Any, Optional
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from .coindesk_client import CoinDeskClient
+from .coindesk_client import coindesk_client
 from .paper_broker import paper_broker
 from .news_aggregator import news_aggregator
 from .indicators import TechnicalIndicators
 from .redis_client import redis_client
+from .log_queue import log_decision, log_signal
 from .config import settings
 
 
+@dataclass(slots=True)
 class AgentState:
-    def __init__(self, user_id: int, instrument: str = "XBX-USD"):
-        self.user_id = user_id
-        self.instrument = instrument
-        self.market_data = {}
-        self.portfolio = {}
-        self.research = {}
-        self.indicators = {}
-        self.risk_checks = {}
-        self.decision = {}
-        self.action = {}
-        self.explanation = {}
+    user_id: int
+    instrument: str = "XBX-USD"
+    market_data: Dict[str, Any] = field(default_factory=dict)
+    portfolio: Dict[str, Any] = field(default_factory=dict)
+    research: Dict[str, Any] = field(default_factory=dict)
+    indicators: Dict[str, Any] = field(default_factory=dict)
+    indicator_frame: Optional[np.ndarray] = None
+    indicators_last: Dict[str, float] = field(default_factory=dict)
+    market_data_last: Dict[str, Any] = field(default_factory=dict)
+    risk_checks: Dict[str, Any] = field(default_factory=dict)
+    decision: Dict[str, Any] = field(default_factory=dict)
+    action: Dict[str, Any] = field(default_factory=dict)
+    explanation: Dict[str, Any] = field(default_factory=dict)
+    pre_risk_failed: bool = False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "instrument": self.instrument,
+            "market_data": self.market_data,
+            "portfolio": self.portfolio,
+            "research": self.research,
+            "indicators": self.indicators,
+            "risk_checks": self.risk_checks,
+            "decision": self.decision,
+            "action": self.action,
+            "explanation": self.explanation
+        }
+
+
+async def _ready(value):
+    return value
+
+
+def _last_value(values) -> float:
+    return float(values[-1]) if values is not None and len(values) > 0 else 0
+
+
+_SUMMARY_INDICATORS = ("rsi", "macd", "ema_12", "ema_26", "atr")
+
+# Risk limits are fixed for the life of the process; read them once instead of every cycle
+_MAX_POSITION_PCT = settings.max_position_pct
+_LOSS_HALT_PCT = settings.daily_loss_halt_pct * 100
+
+
+# DecideNode's scoring rules: one weight and reason per entry of its condition vector
+_SIGNAL_WEIGHTS = np.array([0.3, -0.3, 0.2, -0.2, 0.1, -0.1, 0.1, -0.1, 0.0, 0.0, 0.1, -0.1])
+_SIGNAL_REASONS = (
+    "RSI oversold: {rsi:.2f}",
+    "RSI overbought: {rsi:.2f}",
+    "MACD bullish crossover",
+    "MACD bearish crossover",
+    "EMA 12 > EMA 26 (bullish trend)",
+    "EMA 12 < EMA 26 (bearish trend)",
+    "Price above EMA 12",
+    "Price below EMA 12",
+    "Positive news sentiment: {sentiment:.2f}",
+    "Negative news sentiment: {sentiment:.2f}",
+    "Strong 1h price increase: {change:.2f}%",
+    "Strong 1h price decrease: {change:.2f}%"
+)
+
+
+def _first_candle(market_data: Dict[str, Any], key: str) -> Dict[str, Any]:
+    # get_market_summary stores the latest bar as one dict; a list of bars yields its first
+    candles = market_data.get(key) if market_data else None
+    if isinstance(candles, dict):
+        return candles
+    return candles[0] if candles else {}
 
 
 class CollectNode:
     @staticmethod
-    async def execute(state: AgentState) -> AgentState:
+    async def _fetch_market_data(instrument: str) -> Dict:
+        # Only one worker per instrument refreshes; the others wait briefly for its result
+        lock_name = f"market:{instrument}"
+        acquired = await asyncio.to_thread(redis_client.acquire_lock, lock_name, 5)
+        if not acquired:
+            for _ in range(10):
+                await asyncio.sleep(0.1)
+                cached = await asyncio.to_thread(redis_client.get_market_data, instrument)
+                if cached is not None:
+                    return cached
+        
         try:
-            async with CoinDeskClient() as client:
-                market_data = await client.get_market_summary([state.instrument])
-                state.market_data = market_data.get(state.instrument, {})
-                
-                portfolio = await paper_broker.get_portfolio_summary(state.user_id)
-                state.portfolio = portfolio
-                
-                news_items = await news_aggregator.get_news_for_symbol(state.instrument, limit=20)
-                news_summary = news_aggregator.get_news_summary(news_items, top_k=5)
-                state.research = news_summary
-                
-                redis_client.set_market_data(state.instrument, state.market_data, ttl=60)
-                redis_client.set_portfolio_data(str(state.user_id), state.portfolio, ttl=30)
-                
+            market_data = await coindesk_client.get_market_summary([instrument])
+            return market_data.get(instrument, {})
+        finally:
+            if acquired:
+                await asyncio.to_thread(redis_client.release_lock, lock_name)
+    
+    @staticmethod
+    async def execute(state: AgentState, force_refresh: bool = False) -> AgentState:
+        try:
+            cached_market = cached_portfolio = None
+            if not force_refresh:
+                cached_market, cached_portfolio = await asyncio.gather(
+                    asyncio.to_thread(redis_client.get_market_data, state.instrument),
+                    asyncio.to_thread(redis_client.get_portfolio_data, str(state.user_id))
+                )
+            
+            # The legs are independent, so fetch whatever the cache could not supply concurrently
+            market_data, portfolio, news_items = await asyncio.gather(
+                CollectNode._fetch_market_data(state.instrument) if cached_market is None else _ready(cached_market),
+                paper_broker.get_portfolio_summary(state.user_id) if cached_portfolio is None else _ready(cached_portfolio),
+                news_aggregator.get_news_for_symbol(state.instrument, limit=20),
+                return_exceptions=True
+            )
+            
+            if isinstance(market_data, Exception):
+                print(f"Collect node market data error: {market_data}")
+                market_data = {}
+            state.market_data = market_data
+            
+            if isinstance(portfolio, Exception):
+                print(f"Collect node portfolio error: {portfolio}")
+                portfolio = {}
+            state.portfolio = portfolio
+            
+            if isinstance(news_items, Exception):
+                print(f"Collect node news error: {news_items}")
+                news_items = []
+            state.research = news_aggregator.get_news_summary(news_items, top_k=5)
+            
+            # Write back only freshly fetched entries, in one pipelined round trip off the event loop
+            to_cache = []
+            if cached_market is None and state.market_data:
+                to_cache.append((f"market:{state.instrument}", state.market_data, 60))
+            if cached_portfolio is None and state.portfolio:
+                to_cache.append((f"portfolio:{state.user_id}", state.portfolio, 30))
+            if to_cache:
+                await asyncio.to_thread(redis_client.pipeline_set_many, to_cache)
+            
         except Exception as e:
             print(f"Collect node error: {e}")
             state.market_data = {}
@@ -51,21 +158,95 @@ class CollectNode:
         return state
 
 
+class PreRiskNode:
+    @staticmethod
+    def checks(portfolio: Dict[str, Any], research: Dict[str, Any]) -> Dict[str, bool]:
+        """Risk checks that need only the portfolio and news, not indicators"""
+        checks = {"daily_loss_check": True, "news_shock_check": True}
+        
+        if portfolio:
+            pnl_pct = portfolio.get("pnl_pct", 0)
+            checks["daily_loss_check"] = pnl_pct >= -_LOSS_HALT_PCT
+        
+        if research and research.get("high_impact_news"):
+            high_impact_news = research["high_impact_news"]
+            negative_news = [item for item in high_impact_news if item.get("sentiment", 0) < -0.3]
+            checks["news_shock_check"] = len(negative_news) == 0
+        
+        return checks
+    
+    @staticmethod
+    async def execute(state: AgentState) -> AgentState:
+        checks = PreRiskNode.checks(state.portfolio, state.research)
+        if not all(checks.values()):
+            # The cycle will hold regardless of indicators, so skip straight to Act/Explain
+            state.pre_risk_failed = True
+            state.risk_checks = {
+                "max_position_check": True,
+                "volatility_check": True,
+                "liquidity_check": True,
+                **checks
+            }
+            state.decision = {
+                "action": "hold",
+                "quantity": 0,
+                "confidence": 0.0,
+                "reasoning": ["Risk checks failed"]
+            }
+        return state
+
+
 class AnalyzeNode:
+    @staticmethod
+    async def load_history(instrument: str) -> Optional[np.ndarray]:
+        # The market summary only carries the latest bar; indicators run over the packed minute history
+        return await coindesk_client.get_historical_ohlc_array(instrument, "minutes", 120)
+    
+    @staticmethod
+    async def load_stream_state(instrument: str, ohlc_data) -> Optional[Dict]:
+        if len(ohlc_data) < 20:
+            return None
+        # EMA 12/26 and RSI advance from the persisted state instead of the full history
+        base = await asyncio.to_thread(redis_client.get_indicator_state, instrument)
+        new_base, stream_state = TechnicalIndicators.resolve_stream_state(base, ohlc_data)
+        if new_base != base:
+            await asyncio.to_thread(redis_client.set_indicator_state, instrument, new_base)
+        return stream_state
+    
+    @staticmethod
+    async def load_indicators(instrument: str, ohlc_data, stream_state: Optional[Dict]) -> Dict[str, Any]:
+        # Process-local LRU first, then the copy another worker published to Redis, then compute
+        indicators = TechnicalIndicators.cached_indicators(instrument, ohlc_data)
+        if indicators is not None:
+            return indicators
+        
+        stamp = TechnicalIndicators.cache_stamp(ohlc_data)
+        indicators = await asyncio.to_thread(redis_client.get_indicator_arrays, instrument, stamp)
+        if indicators is not None:
+            TechnicalIndicators.remember_indicators(instrument, ohlc_data, indicators)
+            return indicators
+        
+        # The JIT'd loops release the GIL, so concurrent agents' computations overlap in worker threads
+        indicators = await asyncio.to_thread(
+            TechnicalIndicators.calculate_all_indicators_cached, instrument, ohlc_data, stream_state
+        )
+        if indicators:
+            await asyncio.to_thread(redis_client.set_indicator_arrays, instrument, stamp, indicators)
+        return indicators
+    
     @staticmethod
     async def execute(state: AgentState) -> AgentState:
         try:
-            if not state.market_data or not state.market_data.get("ohlc_1h"):
-                state.indicators = {}
-                return state
-            
-            ohlc_data = state.market_data.get("ohlc_1h", [])
-            if not ohlc_data:
-                ohlc_data = state.market_data.get("ohlc_1d", [])
-            
-            if ohlc_data:
-                indicators = TechnicalIndicators.calculate_all_indicators(ohlc_data)
-                state.indicators = indicators
+            ohlc_data = await AnalyzeNode.load_history(state.instrument) if state.market_data else None
+            
+            if ohlc_data is not None:
+                stream_state = await AnalyzeNode.load_stream_state(state.instrument, ohlc_data)
+                indicators = await AnalyzeNode.load_indicators(state.instrument, ohlc_data, stream_state)
+                # Convert series to float64 arrays once so later nodes compare plain floats
+                state.indicators = {
+                    name: np.asarray(values, dtype=np.float64) if isinstance(values, list) else values
+                    for name, values in indicators.items()
+                }
             else:
                 state.indicators = {}
                 
@@ -73,6 +254,22 @@ class AnalyzeNode:
             print(f"Analyze node error: {e}")
             state.indicators = {}
         
+        try:
+            # Latest bars of the decision columns in one structured array for RiskNode/DecideNode
+            state.indicator_frame = TechnicalIndicators.to_frame(state.indicators) if state.indicators else None
+            
+            # Latest scalars for ExplainNode, extracted once per cycle
+            state.indicators_last = {name: _last_value(state.indicators.get(name)) for name in _SUMMARY_INDICATORS}
+            state.market_data_last = {
+                "ohlc_1h": _first_candle(state.market_data, "ohlc_1h"),
+                "ohlc_1d": _first_candle(state.market_data, "ohlc_1d")
+            }
+        except Exception as e:
+            print(f"Analyze node error: {e}")
+            state.indicator_frame = None
+            state.indicators_last = {}
+            state.market_data_last = {"ohlc_1h": {}, "ohlc_1d": {}}
+        
         return state
 
 
@@ -92,7 +289,7 @@ class RiskNode:
             indicators = state.indicators
             research = state.research
             
-            if not portfolio or not indicators:
+            if not portfolio or not indicators or state.indicator_frame is None:
                 state.risk_checks = risk_checks
                 return state
             
@@ -101,37 +298,29 @@ class RiskNode:
                 state.risk_checks = risk_checks
                 return state
             
+            last = state.indicator_frame[-1]
+            
             total_value = portfolio.get("total_value", 0)
             cash_balance = portfolio.get("cash_balance", 0)
-            positions = portfolio.get("positions", [])
-            
-            current_position_value = 0
-            for position in positions:
-                if position["instrument"] == state.instrument:
-                    current_position_value = position["market_value"]
-                    break
+            position = portfolio.get("positions_by_instrument", {}).get(state.instrument)
+            current_position_value = position["market_value"] if position else 0
             
             position_pct = current_position_value / total_value if total_value > 0 else 0
-            risk_checks["max_position_check"] = position_pct <= settings.max_position_pct
+            risk_checks["max_position_check"] = position_pct <= _MAX_POSITION_PCT
             
-            pnl_pct = portfolio.get("pnl_pct", 0)
-            risk_checks["daily_loss_check"] = pnl_pct >= -settings.daily_loss_halt_pct * 100
+            risk_checks.update(PreRiskNode.checks(portfolio, research))
             
-            atr = indicators.get("atr", [])
-            if atr and len(atr) > 0:
-                current_atr = atr[-1]
+            current_atr = float(last["atr"])
+            if not np.isnan(current_atr):
                 volatility_threshold = current_price * 0.05
                 risk_checks["volatility_check"] = current_atr <= volatility_threshold
             
-            if research and research.get("high_impact_news"):
-                high_impact_news = research["high_impact_news"]
-                negative_news = [item for item in high_impact_news if item.get("sentiment", 0) < -0.3]
-                risk_checks["news_shock_check"] = len(negative_news) == 0
-            
-            volume_sma = indicators.get("volume_sma", [])
-            if volume_sma and len(volume_sma) > 0:
-                current_volume = state.market_data.get("ohlc_1h", [{}])[0].get("volume", 0) if state.market_data.get("ohlc_1h") else 0
-                avg_volume = volume_sma[-1] if volume_sma[-1] > 0 else 1
+            avg_volume = float(last["volume_sma"])
+            if not np.isnan(avg_volume):
+                # The summary's latest hourly bar is a single dict; CoinDesk upper-cases its fields
+                bar = _first_candle(state.market_data, "ohlc_1h")
+                current_volume = bar.get("VOLUME", bar.get("volume", 0))
+                avg_volume = avg_volume if avg_volume > 0 else 1
                 volume_ratio = current_volume / avg_volume
                 risk_checks["liquidity_check"] = volume_ratio >= 0.5
             
@@ -164,7 +353,7 @@ class DecideNode:
             research = state.research
             portfolio = state.portfolio
             
-            if not indicators or not portfolio:
+            if not indicators or not portfolio or state.indicator_frame is None:
                 state.decision = decision
                 return state
             
@@ -173,62 +362,33 @@ class DecideNode:
                 state.decision = decision
                 return state
             
-            signal_score = 0.0
-            reasoning = []
-            
-            rsi = indicators.get("rsi", [])
-            if rsi and len(rsi) > 0:
-                current_rsi = rsi[-1]
-                if current_rsi < 30:
-                    signal_score += 0.3
-                    reasoning.append(f"RSI oversold: {current_rsi:.2f}")
-                elif current_rsi > 70:
-                    signal_score -= 0.3
-                    reasoning.append(f"RSI overbought: {current_rsi:.2f}")
-            
-            macd = indicators.get("macd", [])
-            macd_signal = indicators.get("macd_signal", [])
-            if macd and macd_signal and len(macd) > 1 and len(macd_signal) > 1:
-                if macd[-1] > macd_signal[-1] and macd[-2] <= macd_signal[-2]:
-                    signal_score += 0.2
-                    reasoning.append("MACD bullish crossover")
-                elif macd[-1] < macd_signal[-1] and macd[-2] >= macd_signal[-2]:
-                    signal_score -= 0.2
-                    reasoning.append("MACD bearish crossover")
-            
-            ema_12 = indicators.get("ema_12", [])
-            ema_26 = indicators.get("ema_26", [])
-            if ema_12 and ema_26 and len(ema_12) > 0 and len(ema_26) > 0:
-                if ema_12[-1] > ema_26[-1]:
-                    signal_score += 0.1
-                    reasoning.append("EMA 12 > EMA 26 (bullish trend)")
-                else:
-                    signal_score -= 0.1
-                    reasoning.append("EMA 12 < EMA 26 (bearish trend)")
-            
-            if current_price > ema_12[-1] if ema_12 else False:
-                signal_score += 0.1
-                reasoning.append("Price above EMA 12")
-            else:
-                signal_score -= 0.1
-                reasoning.append("Price below EMA 12")
-            
-            if research:
-                avg_sentiment = research.get("avg_sentiment", 0)
-                signal_score += avg_sentiment * 0.2
-                if avg_sentiment > 0.1:
-                    reasoning.append(f"Positive news sentiment: {avg_sentiment:.2f}")
-                elif avg_sentiment < -0.1:
-                    reasoning.append(f"Negative news sentiment: {avg_sentiment:.2f}")
-            
+            # Missing columns are NaN, which fails every comparison below
+            last, prev = state.indicator_frame[-1], state.indicator_frame[-2]
+            rsi = float(last["rsi"])
+            m1, m0 = float(last["macd"]), float(prev["macd"])
+            s1, s0 = float(last["macd_signal"]), float(prev["macd_signal"])
+            ema_12, ema_26 = float(last["ema_12"]), float(last["ema_26"])
+            avg_sentiment = research.get("avg_sentiment", 0) if research else 0
             price_change_1h = indicators.get("price_change_1h", 0)
-            if abs(price_change_1h) > 2:
-                if price_change_1h > 0:
-                    signal_score += 0.1
-                    reasoning.append(f"Strong 1h price increase: {price_change_1h:.2f}%")
-                else:
-                    signal_score -= 0.1
-                    reasoning.append(f"Strong 1h price decrease: {price_change_1h:.2f}%")
+            
+            conditions = np.array([
+                rsi < 30,
+                rsi > 70,
+                m1 > s1 and m0 <= s0,
+                m1 < s1 and m0 >= s0,
+                ema_12 > ema_26,
+                ema_12 <= ema_26,
+                current_price > ema_12,
+                not current_price > ema_12,
+                avg_sentiment > 0.1,
+                avg_sentiment < -0.1,
+                price_change_1h > 2,
+                price_change_1h < -2
+            ])
+            signal_score = float(conditions @ _SIGNAL_WEIGHTS) + avg_sentiment * 0.2
+            
+            values = {"rsi": rsi, "sentiment": avg_sentiment, "change": price_change_1h}
+            reasoning = [_SIGNAL_REASONS[i].format(**values) for i in np.flatnonzero(conditions)]
             
             total_value = portfolio.get("total_value", 0)
             cash_balance = portfolio.get("cash_balance", 0)
@@ -238,11 +398,8 @@ class DecideNode:
                 decision["quantity"] = min(cash_balance * 0.1 / current_price, total_value * 0.05 / current_price)
                 decision["confidence"] = min(signal_score, 1.0)
             elif signal_score < -0.3:
-                current_position = 0
-                for position in portfolio.get("positions", []):
-                    if position["instrument"] == state.instrument:
-                        current_position = position["quantity"]
-                        break
+                position = portfolio.get("positions_by_instrument", {}).get(state.instrument)
+                current_position = position["quantity"] if position else 0
                 
                 if current_position > 0:
                     decision["action"] = "sell"
@@ -292,7 +449,7 @@ class ActNode:
                 action["order_id"] = order_result["order_id"]
                 action["fills"] = order_result["fills"]
                 
-                redis_client.invalidate_portfolio_cache(str(state.user_id))
+                await asyncio.to_thread(redis_client.invalidate_portfolio_cache, str(state.user_id))
                 
             except Exception as e:
                 action["error"] = str(e)
@@ -316,21 +473,14 @@ class ExplainNode:
                 "instrument": state.instrument,
                 "market_data": {
                     "price": state.market_data.get("price", 0),
-                    "ohlc_1h": state.market_data.get("ohlc_1h", [{}])[0] if state.market_data.get("ohlc_1h") else {},
-                    "ohlc_1d": state.market_data.get("ohlc_1d", [{}])[0] if state.market_data.get("ohlc_1d") else {}
+                    **state.market_data_last
                 },
                 "portfolio": {
                     "cash_balance": state.portfolio.get("cash_balance", 0),
                     "total_value": state.portfolio.get("total_value", 0),
                     "pnl_pct": state.portfolio.get("pnl_pct", 0)
                 },
-                "indicators": {
-                    "rsi": state.indicators.get("rsi", [0])[-1] if state.indicators.get("rsi") else 0,
-                    "macd": state.indicators.get("macd", [0])[-1] if state.indicators.get("macd") else 0,
-                    "ema_12": state.indicators.get("ema_12", [0])[-1] if state.indicators.get("ema_12") else 0,
-                    "ema_26": state.indicators.get("ema_26", [0])[-1] if state.indicators.get("ema_26") else 0,
-                    "atr": state.indicators.get("atr", [0])[-1] if state.indicators.get("atr") else 0
-                },
+                "indicators": state.indicators_last,
                 "research": {
                     "avg_sentiment": state.research.get("avg_sentiment", 0),
                     "news_count": len(state.research.get("items", [])),
@@ -343,6 +493,37 @@ class ExplainNode:
             
             state.explanation = explanation
             
+            if state.decision:
+                # Fire-and-forget: the drainer task persists it to decision_log in batches
+                log_decision({
+                    "user_id": state.user_id,
+                    "instrument": state.instrument,
+                    "action": state.decision["action"],
+                    "quantity": state.decision.get("quantity"),
+                    "price": state.market_data.get("price"),
+                    "rationale": "; ".join(state.decision.get("reasoning", [])) or state.decision["action"],
+                    "indicators": json.dumps(state.indicators_last, default=str),
+                    "news_items": json.dumps(explanation["research"]["high_impact_news"], default=str),
+                    "risk_checks": json.dumps(state.risk_checks, default=str),
+                    "created_at": explanation["timestamp"]
+                })
+                
+                # Buy/sell calls also go to the signal table that /signals serves
+                if state.decision["action"] in ("buy", "sell") and state.market_data.get("price"):
+                    log_signal({
+                        "user_id": state.user_id,
+                        "instrument": state.instrument,
+                        "signal_type": state.decision["action"],
+                        "strength": state.decision.get("confidence", 0.0),
+                        "price": state.market_data["price"],
+                        "indicators": json.dumps(state.indicators_last, default=str),
+                        "news_summary": json.dumps({
+                            "avg_sentiment": explanation["research"]["avg_sentiment"],
+                            "news_count": explanation["research"]["news_count"]
+                        }),
+                        "created_at": explanation["timestamp"]
+                    })
+            
         except Exception as e:
             print(f"Explain node error: {e}")
             state.explanation = {"error": str(e), "timestamp": datetime.utcnow().isoformat()}
@@ -356,6 +537,7 @@ class TradingAgent:
         self.instrument = instrument
         self.nodes = [
             CollectNode(),
+            PreRiskNode(),
             AnalyzeNode(),
             RiskNode(),
             DecideNode(),
@@ -363,22 +545,35 @@ class TradingAgent:
             ExplainNode()
         ]
     
-    async def execute_cycle(self) -> Dict[str, Any]:
+    async def execute_cycle(self, force_refresh: bool = False) -> Dict[str, Any]:
         state = AgentState(self.user_id, self.instrument)
         
         for node in self.nodes:
+            if state.pre_risk_failed and isinstance(node, (AnalyzeNode, RiskNode, DecideNode)):
+                continue
             try:
-                state = await node.execute(state)
+                if isinstance(node, CollectNode):
+                    state = await node.execute(state, force_refresh=force_refresh)
+                else:
+                    state = await node.execute(state)
             except Exception as e:
                 print(f"Node execution error: {e}")
                 break
         
         return {
-            "state": state.__dict__,
+            "state": state.to_dict(),
             "success": state.action.get("executed", False) if state.action else False
         }
     
+    @staticmethod
+    async def execute_cycle_batch(user_instrument_pairs: List[tuple]) -> List[Dict[str, Any]]:
+        agents = [TradingAgent(user_id, instrument) for user_id, instrument in user_instrument_pairs]
+        return await asyncio.gather(*(agent.execute_cycle() for agent in agents))
+    
     async def run_continuous(self, interval_seconds: int = 300):
+        # Fixed-rate schedule on the monotonic clock so cycle runtime does not accumulate as drift.
+        # The first cycle runs now; later slots land on wall-clock multiples of the interval (candle closes)
+        next_run = time.monotonic() + (-time.time() % interval_seconds) - interval_seconds
         while True:
             try:
                 result = await self.execute_cycle()
@@ -386,4 +581,10 @@ class TradingAgent:
             except Exception as e:
                 print(f"Trading cycle error: {e}")
             
-            await asyncio.sleep(interval_seconds)
+            next_run += interval_seconds
+            now = time.monotonic()
+            if now > next_run:
+                missed = int((now - next_run) // interval_seconds) + 1
+                print(f"Trading cycle overran its interval; skipping {missed} slot(s)")
+                next_run += missed * interval_seconds
+            await asyncio.sleep(next_run - now)
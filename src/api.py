@@ -1,18 +1,35 @@
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Optional, Any
 import asyncio
+import orjson
+from collections import OrderedDict
 from datetime import datetime
 from .paper_broker import paper_broker
-from .coindesk_client import CoinDeskClient
+from .coindesk_client import coindesk_client
+from .http_client import close_session
+from .log_queue import start_drainer, stop_drainer
+from .log_setup import setup_logging, stop_logging
 from .news_aggregator import news_aggregator
 from .agent_nodes import TradingAgent
+from .langgraph_agent import LangGraphTradingAgent
 from .redis_client import redis_client
-from .database import init_database, create_tables
+from .database import init_database, create_tables, close_database, get_database_session, Signal, DecisionLog
+from .config import settings
+from sqlalchemy import select
 
 
-app = FastAPI(title="FinTech Trading Agent API", version="1.0.0")
+app = FastAPI(
+    title="FinTech Trading Agent API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
+
+# Compiled LangGraph agents keyed by (user_id, instrument), least recently used evicted first
+_AGENT_CACHE_SIZE = 1024
+_agent_cache: "OrderedDict[tuple, LangGraphTradingAgent]" = OrderedDict()
 
 app.add_middleware(
     CORSMiddleware,
@@ -59,9 +76,19 @@ class NewsResponse(BaseModel):
 
 @app.on_event("startup")
 async def startup_event():
+    setup_logging()
     await init_database()
     await create_tables()
     print("Database initialized")
+    start_drainer()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_drainer()
+    await close_session()
+    await close_database()
+    stop_logging()
 
 
 @app.get("/health")
@@ -133,17 +160,16 @@ async def cancel_order(user_id: int, order_id: int):
 @app.get("/market/{instrument}", response_model=MarketDataResponse)
 async def get_market_data(instrument: str):
     try:
-        async with CoinDeskClient() as client:
-            market_data = await client.get_market_summary([instrument])
-            data = market_data.get(instrument, {})
-            
-            return MarketDataResponse(
-                instrument=instrument,
-                price=data.get("price"),
-                ohlc_1h=data.get("ohlc_1h"),
-                ohlc_1d=data.get("ohlc_1d"),
-                timestamp=data.get("timestamp", 0)
-            )
+        market_data = await coindesk_client.get_market_summary([instrument])
+        data = market_data.get(instrument, {})
+        
+        return MarketDataResponse(
+            instrument=instrument,
+            price=data.get("price"),
+            ohlc_1h=data.get("ohlc_1h"),
+            ohlc_1d=data.get("ohlc_1d"),
+            timestamp=data.get("timestamp", 0)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -151,17 +177,16 @@ async def get_market_data(instrument: str):
 @app.get("/market/{instrument}/ohlc/{timeframe}")
 async def get_ohlc_data(instrument: str, timeframe: str, limit: int = 120):
     try:
-        async with CoinDeskClient() as client:
-            if timeframe == "minutes":
-                data = await client.get_ohlc_minutes(instrument, limit)
-            elif timeframe == "hours":
-                data = await client.get_ohlc_hourly(instrument, limit)
-            elif timeframe == "days":
-                data = await client.get_ohlc_daily(instrument, limit)
-            else:
-                raise HTTPException(status_code=400, detail="Invalid timeframe")
-            
-            return {"data": data, "timeframe": timeframe, "limit": limit}
+        if timeframe == "minutes":
+            data = await coindesk_client.get_ohlc_minutes(instrument, limit)
+        elif timeframe == "hours":
+            data = await coindesk_client.get_ohlc_hourly(instrument, limit)
+        elif timeframe == "days":
+            data = await coindesk_client.get_ohlc_daily(instrument, limit)
+        else:
+            raise HTTPException(status_code=400, detail="Invalid timeframe")
+        
+        return {"data": data, "timeframe": timeframe, "limit": limit}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -179,14 +204,18 @@ async def get_news(symbol: str, limit: int = 10):
 @app.post("/agent/execute/{user_id}")
 async def execute_agent_cycle(user_id: int, instrument: str = "XBX-USD", mode: str = "auto"):
     try:
-        from .langgraph_agent import LangGraphTradingAgent
-        from .config import settings
-        
-        # Update trading mode
-        settings.trading_mode = mode
+        key = (user_id, instrument)
+        agent = _agent_cache.get(key)
+        if agent is None:
+            agent = LangGraphTradingAgent(user_id=user_id, instrument=instrument)
+            _agent_cache[key] = agent
+            if len(_agent_cache) > _AGENT_CACHE_SIZE:
+                _agent_cache.popitem(last=False)
+        else:
+            _agent_cache.move_to_end(key)
         
-        agent = LangGraphTradingAgent(user_id=user_id, instrument=instrument)
-        result = await agent.execute_cycle()
+        # Mode applies to this cycle only; the global setting is left untouched
+        result = await agent.execute_cycle(mode=mode)
         
         return {
             "success": result["success"],
@@ -204,7 +233,6 @@ async def set_trading_mode(mode: str):
         raise HTTPException(status_code=400, detail="Mode must be 'auto' or 'advisory'")
     
     try:
-        from .config import settings
         settings.trading_mode = mode
         
         return {
@@ -219,8 +247,6 @@ async def set_trading_mode(mode: str):
 @app.get("/agent/status")
 async def get_agent_status():
     try:
-        from .config import settings
-        
         return {
             "trading_mode": settings.trading_mode,
             "app_mode": settings.app_mode,
@@ -236,7 +262,6 @@ async def get_agent_status():
 @app.post("/agent/start/{user_id}")
 async def start_agent(user_id: int, instrument: str = "XBX-USD", interval_seconds: int = 300):
     try:
-        from .langgraph_agent import LangGraphTradingAgent
         agent = LangGraphTradingAgent(user_id, instrument)
         asyncio.create_task(agent.run_continuous(interval_seconds))
         return {"message": f"Agent started for user {user_id} with {interval_seconds}s interval"}
@@ -244,80 +269,95 @@ async def start_agent(user_id: int, instrument: str = "XBX-USD", interval_second
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/signals/{user_id}")
-async def get_signals(user_id: int, limit: int = 50):
+async def _stream_json_rows(key: str, query, serialize) -> StreamingResponse:
+    """Write {key: [...]} one row at a time from a server-side cursor"""
+    # Open the session and run the query before the body starts, so failures are still a 500
+    sessions = get_database_session()
     try:
-        from .database import Signal, get_database_session
-        async for session in get_database_session():
-            from sqlalchemy import select
-            result = await session.execute(
-                select(Signal)
-                .where(Signal.user_id == user_id)
-                .order_by(Signal.created_at.desc())
-                .limit(limit)
-            )
-            signals = result.scalars().all()
-            
-            return {
-                "signals": [
-                    {
-                        "id": signal.id,
-                        "instrument": signal.instrument,
-                        "signal_type": signal.signal_type,
-                        "strength": float(signal.strength),
-                        "price": float(signal.price),
-                        "indicators": signal.indicators,
-                        "news_summary": signal.news_summary,
-                        "created_at": signal.created_at.isoformat()
-                    }
-                    for signal in signals
-                ]
-            }
+        session = await sessions.__anext__()
+        result = await session.stream(query)
     except Exception as e:
+        await sessions.aclose()
         raise HTTPException(status_code=500, detail=str(e))
+    
+    async def body():
+        try:
+            yield b'{"' + key.encode() + b'":['
+            separator = b""
+            async for row in result:
+                yield separator + orjson.dumps(serialize(row))
+                separator = b","
+            yield b"]}"
+        finally:
+            await sessions.aclose()
+    
+    return StreamingResponse(body(), media_type="application/json")
+
+
+def _signal_row(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "instrument": row.instrument,
+        "signal_type": row.signal_type,
+        "strength": float(row.strength),
+        "price": float(row.price),
+        "indicators": row.indicators,
+        "news_summary": row.news_summary,
+        "created_at": row.created_at.isoformat()
+    }
+
+
+def _decision_row(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "instrument": row.instrument,
+        "action": row.action,
+        "quantity": float(row.quantity) if row.quantity else None,
+        "price": float(row.price) if row.price else None,
+        "rationale": row.rationale,
+        "indicators": row.indicators,
+        "news_items": row.news_items,
+        "risk_checks": row.risk_checks,
+        "created_at": row.created_at.isoformat()
+    }
+
+
+@app.get("/signals/{user_id}")
+async def get_signals(user_id: int, limit: int = 50):
+    # Select only the serialized columns so rows skip ORM hydration
+    query = (
+        select(
+            Signal.id, Signal.instrument, Signal.signal_type, Signal.strength,
+            Signal.price, Signal.indicators, Signal.news_summary, Signal.created_at
+        )
+        .where(Signal.user_id == user_id)
+        .order_by(Signal.created_at.desc())
+        .limit(limit)
+    )
+    return await _stream_json_rows("signals", query, _signal_row)
 
 
 @app.get("/decisions/{user_id}")
 async def get_decision_logs(user_id: int, limit: int = 50):
-    try:
-        from .database import DecisionLog, get_database_session
-        async for session in get_database_session():
-            from sqlalchemy import select
-            result = await session.execute(
-                select(DecisionLog)
-                .where(DecisionLog.user_id == user_id)
-                .order_by(DecisionLog.created_at.desc())
-                .limit(limit)
-            )
-            decisions = result.scalars().all()
-            
-            return {
-                "decisions": [
-                    {
-                        "id": decision.id,
-                        "instrument": decision.instrument,
-                        "action": decision.action,
-                        "quantity": float(decision.quantity) if decision.quantity else None,
-                        "price": float(decision.price) if decision.price else None,
-                        "rationale": decision.rationale,
-                        "indicators": decision.indicators,
-                        "news_items": decision.news_items,
-                        "risk_checks": decision.risk_checks,
-                        "created_at": decision.created_at.isoformat()
-                    }
-                    for decision in decisions
-                ]
-            }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    query = (
+        select(
+            DecisionLog.id, DecisionLog.instrument, DecisionLog.action, DecisionLog.quantity,
+            DecisionLog.price, DecisionLog.rationale, DecisionLog.indicators,
+            DecisionLog.news_items, DecisionLog.risk_checks, DecisionLog.created_at
+        )
+        .where(DecisionLog.user_id == user_id)
+        .order_by(DecisionLog.created_at.desc())
+        .limit(limit)
+    )
+    return await _stream_json_rows("decisions", query, _decision_row)
 
 
 @app.get("/cache/stats")
 async def get_cache_stats():
     try:
-        keys = redis_client.get_all_keys()
+        total_keys = await asyncio.to_thread(redis_client.count_keys)
         stats = {
-            "total_keys": len(keys),
+            "total_keys": total_keys,
             "cache_hit_rate": "N/A",
             "memory_usage": "N/A"
         }
@@ -329,7 +369,7 @@ async def get_cache_stats():
 @app.delete("/cache/clear")
 async def clear_cache():
     try:
-        success = redis_client.flush_all()
+        success = await asyncio.to_thread(redis_client.flush_all)
         return {"message": "Cache cleared successfully" if success else "Failed to clear cache"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -337,4 +377,9 @@ async def clear_cache():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"  # uvloop is unavailable on Windows; fall back to the default loop
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop, http="httptools")
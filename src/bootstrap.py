@@ -0,0 +1,22 @@
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+
+@lru_cache(maxsize=1)
+def init() -> Path:
+    """Put the repo on sys.path, run from python/ and load its .env once per process"""
+    root = Path(__file__).resolve().parents[1]
+    python_dir = root / "python"
+
+    for path in (str(root), str(python_dir)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    # Settings reads .env relative to the working directory
+    os.chdir(python_dir)
+    load_dotenv(python_dir / ".env")
+    return root
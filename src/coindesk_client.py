@@ -1,54 +1,55 @@
-import aiohttp
 import asyncio
+import numpy as np
 import websockets
-import json
+import orjson
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from .config import settings
-from .redis_client import redis_client
+from .redis_client import OHLC_DTYPE, redis_client
+from .http_client import get_session
+from .single_flight import SingleFlight
+from .indicators import ohlcv_array
 
 
 class CoinDeskClient:
+    # Shared by all instances so coalescing works across clients, not just within one
+    _summary_flight = SingleFlight()
+    
     def __init__(self):
         self.base_url = "https://data-api.coindesk.com"
         self.ws_url = "wss://data-streamer.coindesk.com"
         self.api_key = settings.coindesk_api_key
         self.headers = {"Authorization": f"Bearer {self.api_key}"}
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.tick_queue_size = 10000
+        self.ticks_dropped = 0
+        self._tick_queue: Optional[asyncio.Queue] = None
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(headers=self.headers)
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        # Requests go through the process-wide session; http_client.close_session() tears it down
+        pass
     
     async def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict]:
-        if not self.session:
-            async with aiohttp.ClientSession(headers=self.headers) as session:
-                async with session.get(f"{self.base_url}{endpoint}", params=params, timeout=10) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        print(f"CoinDesk API error: {response.status} - {await response.text()}")
-                        return None
-        else:
-            async with self.session.get(f"{self.base_url}{endpoint}", params=params, timeout=10) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    print(f"CoinDesk API error: {response.status} - {await response.text()}")
-                    return None
+        session = await get_session()
+        async with session.get(f"{self.base_url}{endpoint}", params=params, headers=self.headers, timeout=10) as response:
+            if response.status == 200:
+                return orjson.loads(await response.read())
+            else:
+                print(f"CoinDesk API error: {response.status} - {await response.text()}")
+                return None
     
     async def get_historical_ohlc(self, instrument: str = "XBX-USD", timeframe: str = "minutes", 
                                  limit: int = 120, market: str = "sda") -> Optional[List[Dict]]:
-        cache_key = f"{instrument}:{timeframe}:{limit}"
-        cached_data = redis_client.get_ohlc_data(cache_key, timeframe)
+        cache_key = f"{redis_client.ohlc_prefix}{instrument}:{timeframe}:{limit}:{timeframe}"
+        (cached_data,), limited = await asyncio.to_thread(
+            redis_client.cache_get_with_rate_check, [cache_key], "coindesk_ohlc", 100, 60
+        )
         if cached_data:
             return cached_data
         
-        if redis_client.is_rate_limited("coindesk_ohlc", 100, 60):
+        if limited:
             print("Rate limited for OHLC data")
             return None
         
@@ -61,23 +62,30 @@ class CoinDeskClient:
         }
         
         data = await self._make_request(endpoint, params)
-        if data and "Data" in data:
-            ohlc_data = data["Data"]
-            redis_client.set_ohlc_data(cache_key, timeframe, ohlc_data, ttl=300)
-            return ohlc_data
-        
-        return None
+        ohlc_data = data["Data"] if data and "Data" in data else None
+        entries = [(cache_key, ohlc_data, 300)] if ohlc_data is not None else []
+        await asyncio.to_thread(redis_client.pipeline_set_and_record, entries, "coindesk_ohlc", 60)
+        return ohlc_data
     
-    async def get_latest_tick(self, instrument: str = "XBX-USD", market: str = "sda") -> Optional[Dict]:
-        cache_key = f"tick:{instrument}"
-        cached_tick = redis_client.cache_get(cache_key)
-        if cached_tick:
-            return cached_tick
+    async def get_historical_ohlc_array(self, instrument: str = "XBX-USD", timeframe: str = "minutes",
+                                        limit: int = 120, market: str = "sda") -> Optional[np.ndarray]:
+        """get_historical_ohlc decoded once into an (N, 5) open/high/low/close/volume array"""
+        # Packed float32 copy alongside the dict cache, which /ohlc still serves verbatim
+        cache_key = f"{redis_client.ohlc_prefix}{instrument}:{timeframe}:{limit}:ohlcv32"
+        cached = await asyncio.to_thread(redis_client.get_ohlc_bytes, cache_key)
+        if cached is not None:
+            return cached
         
-        if redis_client.is_rate_limited("coindesk_tick", 200, 60):
-            print("Rate limited for tick data")
+        ohlc_data = await self.get_historical_ohlc(instrument, timeframe, limit, market)
+        if not ohlc_data:
             return None
         
+        # Quantize once so a miss returns exactly what later hits read back: same values, stamps and bar ids
+        ohlcv = ohlcv_array(ohlc_data).astype(OHLC_DTYPE)
+        redis_client.write_behind(redis_client.set_ohlc_bytes, cache_key, ohlcv, 300)
+        return ohlcv
+    
+    async def _fetch_tick(self, instrument: str, market: str = "sda") -> Optional[Dict]:
         endpoint = "/index/cc/v2/historical/messages"
         current_time = int(time.time())
         params = {
@@ -90,24 +98,57 @@ class CoinDeskClient:
         
         data = await self._make_request(endpoint, params)
         if data and "Data" in data and data["Data"]:
-            latest_tick = data["Data"][-1]
-            redis_client.cache_set(cache_key, latest_tick, ttl=30)
-            return latest_tick
-        
+            return data["Data"][-1]
         return None
     
+    async def get_latest_tick(self, instrument: str = "XBX-USD", market: str = "sda") -> Optional[Dict]:
+        cache_key = f"tick:{instrument}"
+        (cached_tick,), limited = await asyncio.to_thread(
+            redis_client.cache_get_with_rate_check, [cache_key], "coindesk_tick", 200, 60
+        )
+        if cached_tick:
+            return cached_tick
+        
+        if limited:
+            print("Rate limited for tick data")
+            return None
+        
+        latest_tick = await self._fetch_tick(instrument, market)
+        entries = [(cache_key, latest_tick, 30)] if latest_tick else []
+        await asyncio.to_thread(redis_client.pipeline_set_and_record, entries, "coindesk_tick", 60)
+        return latest_tick
+    
     async def get_latest_price(self, instrument: str = "XBX-USD") -> Optional[float]:
-        cached_price = redis_client.get_latest_price(instrument)
+        # Cached price, cached tick and the tick rate window come back in one round trip
+        price_key = f"price:{instrument}:latest"
+        tick_key = f"tick:{instrument}"
+        (cached_price, tick_data), limited = await asyncio.to_thread(
+            redis_client.cache_get_with_rate_check, [price_key, tick_key], "coindesk_tick", 200, 60
+        )
         if cached_price:
             return cached_price
         
-        tick_data = await self.get_latest_tick(instrument)
+        entries = []
+        fetched = False
+        if not tick_data:
+            if limited:
+                print("Rate limited for tick data")
+                return None
+            tick_data = await self._fetch_tick(instrument)
+            fetched = True
+            if tick_data:
+                entries.append((tick_key, tick_data, 30))
+        
+        price = None
         if tick_data and "VALUE" in tick_data:
             price = float(tick_data["VALUE"])
-            redis_client.set_latest_price(instrument, price, ttl=30)
-            return price
+            entries.append((price_key, price, 30))
         
-        return None
+        if fetched:
+            await asyncio.to_thread(redis_client.pipeline_set_and_record, entries, "coindesk_tick", 60)
+        elif entries:
+            await asyncio.to_thread(redis_client.pipeline_set_many, entries)
+        return price
     
     async def get_ohlc_daily(self, instrument: str = "XBX-USD", days: int = 30) -> Optional[List[Dict]]:
         return await self.get_historical_ohlc(instrument, "days", days)
@@ -119,6 +160,7 @@ class CoinDeskClient:
         return await self.get_historical_ohlc(instrument, "minutes", minutes)
     
     async def stream_ticks(self, instruments: List[str] = None, callback=None):
+        """Stream latest ticks; callback receives a list of every tick queued since its last call"""
         if not instruments:
             instruments = ["XBX-USD"]
         
@@ -134,53 +176,121 @@ class CoinDeskClient:
                     "instruments": instruments
                 }
                 
-                await websocket.send(json.dumps(subscribe_message))
+                await websocket.send(orjson.dumps(subscribe_message).decode())
                 print(f"Subscribed to tick stream for {instruments}")
                 
-                async for message in websocket:
-                    try:
-                        data = json.loads(message)
-                        if callback:
-                            await callback(data)
-                        else:
-                            print(f"Tick data: {data}")
-                    except json.JSONDecodeError as e:
-                        print(f"JSON decode error: {e}")
-                    except Exception as e:
-                        print(f"Message processing error: {e}")
+                # Bounded buffer so a slow callback never stalls the socket read
+                queue: asyncio.Queue = asyncio.Queue(maxsize=self.tick_queue_size)
+                self._tick_queue = queue
+                await asyncio.gather(
+                    self._read_ticks(websocket, queue),
+                    self._consume_ticks(queue, callback)
+                )
                         
         except websockets.exceptions.ConnectionClosed:
             print("WebSocket connection closed")
         except Exception as e:
             print(f"WebSocket error: {e}")
     
+    async def _read_ticks(self, websocket, queue: asyncio.Queue):
+        """Parse socket messages into the queue, dropping ticks when the consumer falls behind"""
+        try:
+            async for message in websocket:
+                try:
+                    queue.put_nowait(orjson.loads(message))
+                except asyncio.QueueFull:
+                    self.ticks_dropped += 1
+                    if self.ticks_dropped % 1000 == 1:
+                        print(f"Tick queue full, dropped {self.ticks_dropped} ticks so far")
+                except orjson.JSONDecodeError as e:
+                    print(f"JSON decode error: {e}")
+        finally:
+            # Sentinel tells the consumer to finish once it has drained what is left
+            await queue.put(None)
+    
+    async def _consume_ticks(self, queue: asyncio.Queue, callback):
+        """Hand the callback every tick that is waiting, one batch per call"""
+        while True:
+            batch = [await queue.get()]
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            done = batch[-1] is None
+            if done:
+                batch.pop()
+            
+            if batch:
+                try:
+                    if callback:
+                        await callback(batch)
+                    else:
+                        for tick in batch:
+                            print(f"Tick data: {tick}")
+                except Exception as e:
+                    print(f"Message processing error: {e}")
+            
+            if done:
+                return
+    
+    def stream_metrics(self) -> Dict[str, int]:
+        """Current tick queue depth and the number of ticks dropped on overflow"""
+        queue = self._tick_queue
+        return {
+            "queue_depth": queue.qsize() if queue else 0,
+            "queue_size": self.tick_queue_size,
+            "ticks_dropped": self.ticks_dropped
+        }
+    
+    async def _fetch_instrument_summary(self, instrument: str) -> Dict[str, Any]:
+        price, ohlc_1h, ohlc_1d = await asyncio.gather(
+            self.get_latest_price(instrument),
+            self.get_ohlc_hourly(instrument, 1),
+            self.get_ohlc_daily(instrument, 1)
+        )
+        
+        summary = {
+            "price": price,
+            "ohlc_1h": ohlc_1h[0] if ohlc_1h else None,
+            "ohlc_1d": ohlc_1d[0] if ohlc_1d else None,
+            "timestamp": time.time()
+        }
+        
+        return summary
+    
+    async def _coalesced_summary(self, instrument: str) -> Tuple[Dict[str, Any], bool]:
+        """Return (summary, fetched); fetched is False when another caller's request was reused"""
+        return await CoinDeskClient._summary_flight.run(instrument, lambda: self._fetch_instrument_summary(instrument))
+    
     async def get_market_summary(self, instruments: List[str] = None) -> Dict[str, Any]:
         if not instruments:
             instruments = ["XBX-USD"]
         
-        market_data = {}
+        results = await asyncio.gather(
+            *(self._coalesced_summary(instrument) for instrument in instruments),
+            return_exceptions=True
+        )
         
-        for instrument in instruments:
-            try:
-                price = await self.get_latest_price(instrument)
-                ohlc_1h = await self.get_ohlc_hourly(instrument, 1)
-                ohlc_1d = await self.get_ohlc_daily(instrument, 1)
-                
-                market_data[instrument] = {
-                    "price": price,
-                    "ohlc_1h": ohlc_1h[0] if ohlc_1h else None,
-                    "ohlc_1d": ohlc_1d[0] if ohlc_1d else None,
-                    "timestamp": time.time()
-                }
-                
-                redis_client.set_market_data(instrument, market_data[instrument], ttl=60)
-                
-            except Exception as e:
-                print(f"Error getting market data for {instrument}: {e}")
+        market_data = {}
+        to_cache = []
+        for instrument, result in zip(instruments, results):
+            if isinstance(result, Exception):
+                print(f"Error getting market data for {instrument}: {result}")
                 market_data[instrument] = None
+                continue
+            summary, fetched = result
+            market_data[instrument] = summary
+            if fetched:
+                to_cache.append((instrument, summary))
+        
+        # Only the caller that fetched writes, and all of its summaries go out in one pipeline
+        if to_cache:
+            redis_client.write_behind(redis_client.mset_market_data, to_cache, 60)
         
         return market_data
 
 
+coindesk_client = CoinDeskClient()
+
+
 async def get_coindesk_client() -> CoinDeskClient:
-    return CoinDeskClient()
+    return coindesk_client
@@ -1,4 +1,5 @@
 import os
+from functools import cached_property, lru_cache
 from pydantic_settings import BaseSettings
 from typing import Dict, List
 
@@ -34,8 +35,9 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = False
     
-    @property
+    @cached_property
     def credibility_weights(self) -> Dict[str, float]:
+        # Parsed once; the table does not change after startup
         weights = {}
         for pair in self.news_credibility_table.split(','):
             source, weight = pair.split(':')
@@ -43,4 +45,10 @@ class Settings(BaseSettings):
         return weights
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Parse .env and validate once per process"""
+    return Settings()
+
+
+settings = get_settings()
@@ -1,14 +1,27 @@
 import asyncio
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, BigInteger, String, Numeric, DateTime, Text, Boolean, ForeignKey, CheckConstraint
+from sqlalchemy import Column, BigInteger, Integer, String, Numeric, DateTime, Text, Boolean, ForeignKey, CheckConstraint, Index
+from sqlalchemy import inspect, select, delete, text
 from sqlalchemy import DateTime
 from datetime import datetime
-from typing import Optional
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Dict, List, Optional
 from .config import settings
 
 Base = declarative_base()
 
+# Integer minor units mirrored next to the Numeric columns: prices in micro-USD, quantities in nano-units
+PRICE_SCALE = 10 ** 6
+QTY_SCALE = 10 ** 9
+
+
+def to_minor(value, scale: int) -> Optional[int]:
+    if value is None:
+        return None
+    return int((Decimal(str(value)) * scale).to_integral_value(ROUND_HALF_EVEN))
+
+
 class PaperAccount(Base):
     __tablename__ = "paper_account"
     
@@ -27,6 +40,8 @@ class PaperPosition(Base):
     instrument = Column(String(50), nullable=False)
     qty = Column(Numeric(38, 18), nullable=False, default=0)
     avg_price = Column(Numeric(18, 8), nullable=False, default=0)
+    qty_nanos = Column(BigInteger)
+    avg_price_micros = Column(BigInteger)
     updated_at = Column(DateTime, default=datetime.utcnow)
     
     __table_args__ = (
@@ -52,6 +67,10 @@ class PaperOrder(Base):
         CheckConstraint("side IN ('buy', 'sell')", name="check_side"),
         CheckConstraint("order_type IN ('market', 'limit')", name="check_order_type"),
         CheckConstraint("status IN ('created', 'filled', 'partial', 'canceled', 'rejected')", name="check_status"),
+        # Open orders per account; filled/canceled rows never enter the index
+        Index("ix_order_account_open", "account_id", "status",
+              postgresql_where=text("status IN ('created', 'partial')")),
+        Index("ix_order_account_time", account_id, created_at.desc()),
     )
 
 class PaperFill(Base):
@@ -62,6 +81,8 @@ class PaperFill(Base):
     price = Column(Numeric(18, 8), nullable=False)
     qty = Column(Numeric(38, 18), nullable=False)
     fee = Column(Numeric(18, 8), nullable=False, default=0)
+    price_micros = Column(BigInteger)
+    qty_nanos = Column(BigInteger)
     filled_at = Column(DateTime, default=datetime.utcnow)
 
 class Signal(Base):
@@ -76,6 +97,10 @@ class Signal(Base):
     indicators = Column(Text)
     news_summary = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_signal_user_time", user_id, created_at.desc()),
+    )
 
 class DecisionLog(Base):
     __tablename__ = "decision_log"
@@ -91,6 +116,10 @@ class DecisionLog(Base):
     news_items = Column(Text)
     risk_checks = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_decision_user_time", user_id, created_at.desc()),
+    )
 
 class NewsItem(Base):
     __tablename__ = "news_item"
@@ -106,6 +135,37 @@ class NewsItem(Base):
     sentiment = Column(Numeric(3, 2))
     credibility_score = Column(Numeric(3, 2))
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_news_symbol_time", symbol, published_at.desc()),
+    )
+
+class SchemaVersion(Base):
+    __tablename__ = "_schema"
+    
+    version = Column(Integer, primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+# Bump whenever the models above change so setup re-runs the DDL
+SCHEMA_VERSION = 3
+
+# create_all only creates missing tables; columns added to existing ones go here, keyed by version
+MIGRATIONS = {
+    2: [
+        "ALTER TABLE paper_position ADD COLUMN IF NOT EXISTS qty_nanos BIGINT",
+        "ALTER TABLE paper_position ADD COLUMN IF NOT EXISTS avg_price_micros BIGINT",
+        "ALTER TABLE paper_fill ADD COLUMN IF NOT EXISTS price_micros BIGINT",
+        "ALTER TABLE paper_fill ADD COLUMN IF NOT EXISTS qty_nanos BIGINT",
+    ],
+    3: [
+        "CREATE INDEX IF NOT EXISTS ix_order_account_open ON paper_order (account_id, status) "
+        "WHERE status IN ('created', 'partial')",
+        "CREATE INDEX IF NOT EXISTS ix_order_account_time ON paper_order (account_id, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_signal_user_time ON signal (user_id, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_decision_user_time ON decision_log (user_id, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_news_symbol_time ON news_item (symbol, published_at DESC)",
+    ],
+}
 
 engine = None
 SessionLocal = None
@@ -113,6 +173,9 @@ SessionLocal = None
 async def init_database():
     global engine, SessionLocal
     
+    if engine is not None:
+        return
+    
     database_url = settings.neon_database_url
     if database_url.startswith("postgresql://"):
         database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
@@ -122,6 +185,15 @@ async def init_database():
         database_url,
         pool_size=5,
         max_overflow=10,
+        # Neon drops idle connections; check on checkout and recycle before it does
+        pool_pre_ping=True,
+        pool_recycle=300,
+        connect_args={
+            "statement_cache_size": 1024,
+            "prepared_statement_cache_size": 512,
+            # Short OLTP queries never benefit from JIT compilation
+            "server_settings": {"jit": "off"}
+        },
         echo=False
     )
     
@@ -148,7 +220,69 @@ async def create_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+async def current_schema_version(conn) -> int:
+    has_table = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table(SchemaVersion.__tablename__))
+    if not has_table:
+        return 0
+    
+    result = await conn.execute(select(SchemaVersion.version).limit(1))
+    return result.scalar() or 0
+
+async def set_schema_version(conn, version: int):
+    await conn.execute(delete(SchemaVersion))
+    await conn.execute(SchemaVersion.__table__.insert().values(version=version, applied_at=datetime.utcnow()))
+
+async def ensure_schema(target: int = SCHEMA_VERSION) -> bool:
+    """Create tables unless the database is already at target; returns True if DDL ran"""
+    if not engine:
+        await init_database()
+    
+    # One transaction for the version check and all DDL
+    async with engine.begin() as conn:
+        current = await current_schema_version(conn)
+        if current >= target:
+            return False
+        await conn.run_sync(Base.metadata.create_all)
+        for version in range(current + 1, target + 1):
+            for statement in MIGRATIONS.get(version, []):
+                await conn.execute(text(statement))
+        await set_schema_version(conn, target)
+    return True
+
+# Below this many rows a multi-row INSERT beats setting up a COPY
+COPY_THRESHOLD = 50
+
+async def bulk_insert(model, rows: List[Dict]) -> int:
+    """Insert plain dict rows; large batches go through asyncpg's binary COPY"""
+    if not rows:
+        return 0
+    if not engine:
+        await init_database()
+    
+    async with engine.begin() as conn:
+        if len(rows) < COPY_THRESHOLD:
+            await conn.execute(model.__table__.insert(), rows)
+            return len(rows)
+        
+        # COPY bypasses SQLAlchemy, so apply the Python-side column defaults here
+        columns = list(rows[0].keys())
+        defaults = {
+            column.name: column.default.arg(None) if column.default.is_callable else column.default.arg
+            for column in model.__table__.columns
+            if column.name not in columns and column.default is not None and not column.primary_key
+        }
+        columns += list(defaults)
+        records = [tuple({**defaults, **row}.get(name) for name in columns) for row in rows]
+        
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            model.__tablename__, records=records, columns=columns
+        )
+    return len(rows)
+
 async def close_database():
-    global engine
+    global engine, SessionLocal
     if engine:
         await engine.dispose()
+        engine = None
+        SessionLocal = None
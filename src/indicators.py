@@ -1,40 +1,299 @@
 import numpy as np
-import pandas as pd
+import threading
+from collections import OrderedDict
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import List, Dict, Optional
-import ta
+
+from ._njit import HAVE_NUMBA, jit
+
+
+_INDICATOR_CACHE_SIZE = 64
+_indicator_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+_indicator_cache_lock = threading.Lock()  # AnalyzeNode computes in worker threads
+
+_RSI_PERIOD = 14
+
+# Columns the risk and decision nodes read, stored side by side per bar
+_IND_DTYPE = np.dtype([
+    ("rsi", "f8"),
+    ("macd", "f8"),
+    ("macd_signal", "f8"),
+    ("ema_12", "f8"),
+    ("ema_26", "f8"),
+    ("atr", "f8"),
+    ("volume_sma", "f8")
+])
+
+
+# CoinDesk returns upper-case fields; cached or hand-built candles may use lower case
+_OHLCV_FIELDS = (
+    ("OPEN", "HIGH", "LOW", "CLOSE", "VOLUME"),
+    ("open", "high", "low", "close", "volume")
+)
+
+
+def ohlcv_array(ohlc_data) -> np.ndarray:
+    """Decode candles once into an (N, 5) float64 array of open, high, low, close, volume"""
+    if isinstance(ohlc_data, np.ndarray):
+        return ohlc_data
+    if not ohlc_data:
+        return np.empty((0, 5), dtype=np.float64)
+    
+    o, h, l, c, v = _OHLCV_FIELDS[0] if "CLOSE" in ohlc_data[0] else _OHLCV_FIELDS[1]
+    return np.array(
+        [(candle.get(o, 0.0), candle[h], candle[l], candle[c], candle.get(v, 0)) for candle in ohlc_data],
+        dtype=np.float64
+    )
+
+
+def _candle_ts(candle: Dict):
+    return candle.get("timestamp", candle.get("TIMESTAMP"))
+
+
+def _bar_id(ohlc_data, index: int):
+    # Candle dicts carry a timestamp; packed rows don't, but a closed bar's OHLCV never changes
+    if isinstance(ohlc_data, np.ndarray):
+        return ohlc_data[index].tobytes().hex()
+    return _candle_ts(ohlc_data[index])
+
+
+def _backfill(values: np.ndarray, window: int) -> np.ndarray:
+    """Pad a per-window result back to full length, repeating the first full window's value"""
+    return np.concatenate((np.full(window - 1, values[0]), values))
+
+
+@jit
+def _ema_loop(values, alpha):
+    out = np.empty_like(values)
+    out[0] = values[0]
+    for i in range(1, values.shape[0]):
+        out[i] = out[i - 1] + alpha * (values[i] - out[i - 1])
+    return out
+
+
+@jit
+def _rsi_loop(close, period):
+    # Wilder smoothing seeded with a zero move at the first bar, matching ta; 50 until warmed up
+    out = np.full(close.shape[0], 50.0)
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, close.shape[0]):
+        delta = close[i] - close[i - 1]
+        avg_gain += (max(delta, 0.0) - avg_gain) / period
+        avg_loss += (max(-delta, 0.0) - avg_loss) / period
+        if i >= period - 1:
+            out[i] = 100.0 if avg_loss == 0.0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return out
+
+
+@jit
+def _atr_loop(high, low, close, period):
+    n = close.shape[0]
+    true_range = np.empty(n)
+    true_range[0] = high[0] - low[0]
+    for i in range(1, n):
+        true_range[i] = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+    
+    atr = np.zeros(n)
+    atr[period - 1] = true_range[:period].mean()
+    for i in range(period, n):
+        atr[i] = (atr[i - 1] * (period - 1) + true_range[i]) / period
+    return atr
+
+
+@jit
+def _adx_loop(high, low, close, period):
+    # Wilder ADX: smoothed TR/+DM/-DM from bar 1, DX from bar `period`, ADX from bar 2 * period - 1
+    n = close.shape[0]
+    adx = np.zeros(n)
+    tr_sum = plus_sum = minus_sum = 0.0
+    dx_sum = 0.0
+    for i in range(1, n):
+        true_range = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        up = high[i] - high[i - 1]
+        down = low[i - 1] - low[i]
+        plus_dm = up if up > down and up > 0.0 else 0.0
+        minus_dm = down if down > up and down > 0.0 else 0.0
+        
+        if i <= period:
+            tr_sum += true_range
+            plus_sum += plus_dm
+            minus_sum += minus_dm
+            if i < period:
+                continue
+        else:
+            tr_sum += true_range - tr_sum / period
+            plus_sum += plus_dm - plus_sum / period
+            minus_sum += minus_dm - minus_sum / period
+        
+        # The smoothing constants cancel in +DI/-DI, so DX works on the sums directly
+        di_total = plus_sum + minus_sum
+        dx = 100.0 * abs(plus_sum - minus_sum) / di_total if tr_sum > 0.0 and di_total > 0.0 else 0.0
+        
+        if i < 2 * period - 1:
+            dx_sum += dx
+        elif i == 2 * period - 1:
+            adx[i] = (dx_sum + dx) / period
+        else:
+            adx[i] = (adx[i - 1] * (period - 1) + dx) / period
+    return adx
+
+
+@jit
+def _sma_loop(values, window):
+    out = np.zeros(values.shape[0])
+    total = 0.0
+    for i in range(values.shape[0]):
+        total += values[i]
+        if i >= window:
+            total -= values[i - window]
+        if i >= window - 1:
+            out[i] = total / window
+    return out
+
+
+def _warm_kernels():
+    """Compile (or load from the on-disk cache) every JIT loop now, not on the first live cycle"""
+    sample = np.linspace(1.0, 2.0, 32)
+    _ema_loop(sample, 0.5)
+    _rsi_loop(sample, 14)
+    _atr_loop(sample + 0.1, sample - 0.1, sample, 14)
+    _adx_loop(sample + 0.1, sample - 0.1, sample, 14)
+    _sma_loop(sample, 20)
+
+
+if HAVE_NUMBA:
+    _warm_kernels()
+
+
+def _undefined(n: int) -> np.ndarray:
+    return np.full(n, np.nan)
+
+
+def _ema(values: np.ndarray, period: int) -> np.ndarray:
+    if values.shape[0] < period:
+        return _undefined(values.shape[0])
+    
+    ema = _ema_loop(values, 2.0 / (period + 1))
+    ema[:period - 1] = ema[period - 1]  # backfill the warm-up window
+    return ema
+
+
+def _rsi(closes: np.ndarray, period: int) -> np.ndarray:
+    if closes.shape[0] < period + 1:
+        return _undefined(closes.shape[0])
+    return _rsi_loop(closes, period)
+
+
+def _macd(closes: np.ndarray, fast: int, slow: int, signal: int,
+          ema_fast: Optional[np.ndarray] = None, ema_slow: Optional[np.ndarray] = None):
+    n = closes.shape[0]
+    if n < slow:
+        return _undefined(n), _undefined(n), _undefined(n)
+    
+    # The EMAs only differ from the raw recursion inside the warm-up, which is zeroed below anyway
+    ema_fast = _ema(closes, fast) if ema_fast is None else ema_fast
+    ema_slow = _ema(closes, slow) if ema_slow is None else ema_slow
+    macd = ema_fast - ema_slow
+    macd[:slow - 1] = 0.0
+    
+    # The signal line only starts once MACD itself is defined
+    macd_signal = np.zeros_like(macd)
+    macd_signal[slow - 1:] = _ema_loop(macd[slow - 1:], 2.0 / (signal + 1))
+    warmup = min(slow + signal - 2, n)
+    macd_signal[:warmup] = 0.0
+    
+    histogram = macd - macd_signal
+    histogram[:warmup] = 0.0
+    return macd, macd_signal, histogram
+
+
+def _atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    if close.shape[0] < period:
+        return _undefined(close.shape[0])
+    return _atr_loop(high, low, close, period)
+
+
+def _adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    # Zero until the first full ADX window, as trend consumers treat 0 as "no trend"
+    if close.shape[0] < period:
+        return np.zeros(close.shape[0])
+    return _adx_loop(high, low, close, period)
+
+
+def _bollinger(closes: np.ndarray, period: int, std_dev: float):
+    if closes.shape[0] < period:
+        return _undefined(closes.shape[0]), _undefined(closes.shape[0]), _undefined(closes.shape[0])
+    
+    # Rolling mean and population std (ddof=0, as ta uses); the warm-up is backfilled from the first full window
+    windows = sliding_window_view(closes, period)
+    middle = _backfill(windows.mean(axis=1), period)
+    deviation = _backfill(windows.std(axis=1), period) * std_dev
+    return middle + deviation, middle, middle - deviation
+
+
+def _stochastic(high: np.ndarray, low: np.ndarray, close: np.ndarray, k_period: int, d_period: int):
+    n = close.shape[0]
+    if n < k_period:
+        return _undefined(n), _undefined(n)
+    
+    lowest = sliding_window_view(low, k_period).min(axis=1)
+    highest = sliding_window_view(high, k_period).max(axis=1)
+    k = _undefined(n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k[k_period - 1:] = 100 * (close[k_period - 1:] - lowest) / (highest - lowest)
+    
+    # %D is a plain rolling mean, so any undefined %K in its window leaves it undefined too
+    d = _undefined(n)
+    d[d_period - 1:] = sliding_window_view(k, d_period).mean(axis=1)
+    
+    return (
+        np.nan_to_num(k, nan=50.0, posinf=50.0, neginf=50.0),
+        np.nan_to_num(d, nan=50.0, posinf=50.0, neginf=50.0)
+    )
+
+
+def _obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    # Volume counts negative only on a down close; the first bar has no prior close and counts positive
+    signed_volume = volume.copy()
+    signed_volume[1:][close[1:] < close[:-1]] *= -1
+    return np.cumsum(signed_volume)
+
+
+def _support_resistance(closes: np.ndarray, window: int):
+    """Rolling min/max over the trailing window; the warm-up uses the partial window once it has 3 bars"""
+    support = _undefined(closes.shape[0])
+    resistance = _undefined(closes.shape[0])
+    if window < 3:
+        return support, resistance
+    
+    windows = sliding_window_view(closes, window)
+    support[window - 1:] = windows.min(axis=1)
+    resistance[window - 1:] = windows.max(axis=1)
+    
+    if window > 3:
+        head = closes[:window - 1]
+        support[2:window - 1] = np.minimum.accumulate(head)[2:]
+        resistance[2:window - 1] = np.maximum.accumulate(head)[2:]
+    return support, resistance
 
 
 class TechnicalIndicators:
     @staticmethod
     def calculate_ema(prices: List[float], period: int) -> List[float]:
-        if len(prices) < period:
-            return [np.nan] * len(prices)
-        
-        df = pd.DataFrame({"close": prices})
-        ema = ta.trend.EMAIndicator(df["close"], window=period).ema_indicator()
-        return ema.fillna(method="bfill").tolist()
+        return _ema(np.asarray(prices, dtype=np.float64), period).tolist()
     
     @staticmethod
     def calculate_rsi(prices: List[float], period: int = 14) -> List[float]:
-        if len(prices) < period + 1:
-            return [np.nan] * len(prices)
-        
-        df = pd.DataFrame({"close": prices})
-        rsi = ta.momentum.RSIIndicator(df["close"], window=period).rsi()
-        return rsi.fillna(50).tolist()
+        return _rsi(np.asarray(prices, dtype=np.float64), period).tolist()
     
     @staticmethod
     def calculate_macd(prices: List[float], fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, List[float]]:
-        if len(prices) < slow:
-            return {"macd": [np.nan] * len(prices), "signal": [np.nan] * len(prices), "histogram": [np.nan] * len(prices)}
-        
-        df = pd.DataFrame({"close": prices})
-        macd_indicator = ta.trend.MACD(df["close"], window_fast=fast, window_slow=slow, window_sign=signal)
-        
+        macd, macd_signal, histogram = _macd(np.asarray(prices, dtype=np.float64), fast, slow, signal)
         return {
-            "macd": macd_indicator.macd().fillna(0).tolist(),
-            "signal": macd_indicator.macd_signal().fillna(0).tolist(),
-            "histogram": macd_indicator.macd_diff().fillna(0).tolist()
+            "macd": macd.tolist(),
+            "signal": macd_signal.tolist(),
+            "histogram": histogram.tolist()
         }
     
     @staticmethod
@@ -42,22 +301,20 @@ class TechnicalIndicators:
         if len(high) < period or len(low) < period or len(close) < period:
             return [np.nan] * len(close)
         
-        df = pd.DataFrame({"high": high, "low": low, "close": close})
-        atr = ta.volatility.AverageTrueRange(df["high"], df["low"], df["close"], window=period).average_true_range()
-        return atr.fillna(method="bfill").tolist()
+        return _atr(
+            np.asarray(high, dtype=np.float64),
+            np.asarray(low, dtype=np.float64),
+            np.asarray(close, dtype=np.float64),
+            period
+        ).tolist()
     
     @staticmethod
     def calculate_bollinger_bands(prices: List[float], period: int = 20, std_dev: float = 2) -> Dict[str, List[float]]:
-        if len(prices) < period:
-            return {"upper": [np.nan] * len(prices), "middle": [np.nan] * len(prices), "lower": [np.nan] * len(prices)}
-        
-        df = pd.DataFrame({"close": prices})
-        bb_indicator = ta.volatility.BollingerBands(df["close"], window=period, window_dev=std_dev)
-        
+        upper, middle, lower = _bollinger(np.asarray(prices, dtype=np.float64), period, std_dev)
         return {
-            "upper": bb_indicator.bollinger_hband().fillna(method="bfill").tolist(),
-            "middle": bb_indicator.bollinger_mavg().fillna(method="bfill").tolist(),
-            "lower": bb_indicator.bollinger_lband().fillna(method="bfill").tolist()
+            "upper": upper.tolist(),
+            "middle": middle.tolist(),
+            "lower": lower.tolist()
         }
     
     @staticmethod
@@ -66,121 +323,219 @@ class TechnicalIndicators:
         if len(high) < k_period or len(low) < k_period or len(close) < k_period:
             return {"k": [np.nan] * len(close), "d": [np.nan] * len(close)}
         
-        df = pd.DataFrame({"high": high, "low": low, "close": close})
-        stoch_indicator = ta.momentum.StochasticOscillator(df["high"], df["low"], df["close"], 
-                                                          window=k_period, smooth_window=d_period)
-        
-        return {
-            "k": stoch_indicator.stoch().fillna(50).tolist(),
-            "d": stoch_indicator.stoch_signal().fillna(50).tolist()
-        }
+        k, d = _stochastic(
+            np.asarray(high, dtype=np.float64),
+            np.asarray(low, dtype=np.float64),
+            np.asarray(close, dtype=np.float64),
+            k_period,
+            d_period
+        )
+        return {"k": k.tolist(), "d": d.tolist()}
     
     @staticmethod
     def calculate_volume_indicators(close: List[float], volume: List[float]) -> Dict[str, List[float]]:
         if len(close) < 20 or len(volume) < 20:
             return {"obv": [0] * len(close), "volume_sma": [0] * len(close)}
         
-        df = pd.DataFrame({"close": close, "volume": volume})
-        
-        obv = ta.volume.OnBalanceVolumeIndicator(df["close"], df["volume"]).on_balance_volume()
-        volume_sma = ta.volume.VolumeSMAIndicator(df["volume"], window=20).volume_sma()
-        
+        close = np.asarray(close, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
         return {
-            "obv": obv.fillna(0).tolist(),
-            "volume_sma": volume_sma.fillna(0).tolist()
+            "obv": _obv(close, volume).tolist(),
+            "volume_sma": _sma_loop(volume, 20).tolist()
         }
     
     @staticmethod
-    def calculate_trend_strength(prices: List[float], period: int = 20) -> List[float]:
-        if len(prices) < period:
-            return [0] * len(prices)
-        
-        df = pd.DataFrame({"close": prices})
-        adx = ta.trend.ADXIndicator(df["close"], df["close"], df["close"], window=period).adx()
-        return adx.fillna(0).tolist()
+    def calculate_trend_strength(highs: List[float], lows: List[float], closes: List[float],
+                                 period: int = 20) -> List[float]:
+        return _adx(
+            np.asarray(highs, dtype=np.float64),
+            np.asarray(lows, dtype=np.float64),
+            np.asarray(closes, dtype=np.float64),
+            period
+        ).tolist()
     
     @staticmethod
     def calculate_support_resistance(prices: List[float], window: int = 20) -> Dict[str, List[float]]:
         if len(prices) < window:
             return {"support": [np.nan] * len(prices), "resistance": [np.nan] * len(prices)}
         
-        support = []
-        resistance = []
-        
-        for i in range(len(prices)):
-            start_idx = max(0, i - window + 1)
-            window_prices = prices[start_idx:i+1]
-            
-            if len(window_prices) < 3:
-                support.append(np.nan)
-                resistance.append(np.nan)
-                continue
-            
-            local_min = min(window_prices)
-            local_max = max(window_prices)
-            
-            support.append(local_min)
-            resistance.append(local_max)
+        support, resistance = _support_resistance(np.asarray(prices, dtype=np.float64), window)
+        return {
+            "support": support.tolist(),
+            "resistance": resistance.tolist()
+        }
+    
+    @staticmethod
+    def seed_stream_state(closes: List[float], timestamp) -> Dict[str, float]:
+        # Same recursions as ta: EMA with alpha=2/(n+1), RSI with Wilder smoothing (alpha=1/14)
+        ema_12 = ema_26 = closes[0]
+        avg_gain = avg_loss = 0.0
+        for prev_close, close in zip(closes, closes[1:]):
+            ema_12 += (close - ema_12) * (2 / 13)
+            ema_26 += (close - ema_26) * (2 / 27)
+            delta = close - prev_close
+            avg_gain += (max(delta, 0.0) - avg_gain) / _RSI_PERIOD
+            avg_loss += (max(-delta, 0.0) - avg_loss) / _RSI_PERIOD
         
         return {
-            "support": support,
-            "resistance": resistance
+            "timestamp": timestamp,
+            "close": closes[-1],
+            "ema_12": ema_12,
+            "ema_26": ema_26,
+            "avg_gain": avg_gain,
+            "avg_loss": avg_loss
         }
     
     @staticmethod
-    def calculate_all_indicators(ohlc_data: List[Dict]) -> Dict[str, any]:
-        if not ohlc_data or len(ohlc_data) < 20:
-            return {}
+    def advance_stream_state(state: Dict[str, float], close: float, timestamp) -> Dict[str, float]:
+        delta = close - state["close"]
+        return {
+            "timestamp": timestamp,
+            "close": close,
+            "ema_12": state["ema_12"] + (close - state["ema_12"]) * (2 / 13),
+            "ema_26": state["ema_26"] + (close - state["ema_26"]) * (2 / 27),
+            "avg_gain": state["avg_gain"] + (max(delta, 0.0) - state["avg_gain"]) / _RSI_PERIOD,
+            "avg_loss": state["avg_loss"] + (max(-delta, 0.0) - state["avg_loss"]) / _RSI_PERIOD
+        }
+    
+    @staticmethod
+    def stream_rsi(state: Dict[str, float]) -> float:
+        if state["avg_loss"] == 0:
+            return 100.0
+        return 100 - 100 / (1 + state["avg_gain"] / state["avg_loss"])
+    
+    @staticmethod
+    def resolve_stream_state(base: Optional[Dict], ohlc_data):
+        """Return (base, current): base is the state as of the last closed bar, current includes the open bar"""
+        if isinstance(ohlc_data, np.ndarray):
+            closes = ohlc_data[:, 3].astype(np.float64).tolist()
+        else:
+            closes = [float(candle["close"]) for candle in ohlc_data]
+        closed_ts = _bar_id(ohlc_data, -2)
+        
+        if base and base["timestamp"] == closed_ts:
+            pass
+        elif base and len(ohlc_data) >= 3 and base["timestamp"] == _bar_id(ohlc_data, -3):
+            # Exactly one bar closed since the last cycle: fold it in O(1)
+            base = TechnicalIndicators.advance_stream_state(base, closes[-2], closed_ts)
+        else:
+            base = TechnicalIndicators.seed_stream_state(closes[:-1], closed_ts)
         
-        closes = [float(candle["close"]) for candle in ohlc_data]
-        highs = [float(candle["high"]) for candle in ohlc_data]
-        lows = [float(candle["low"]) for candle in ohlc_data]
-        volumes = [float(candle.get("volume", 0)) for candle in ohlc_data]
+        current = TechnicalIndicators.advance_stream_state(base, closes[-1], _bar_id(ohlc_data, -1))
+        return base, current
+    
+    @staticmethod
+    def _compute_arrays(ohlc_data, stream_state: Optional[Dict]) -> Dict[str, any]:
+        # Unpack OHLCV once; every indicator below reads these columns. Cached arrays arrive as
+        # float32 and are widened here, so the recursive smoothings never accumulate in 32 bits
+        highs, lows, closes, volumes = ohlcv_array(ohlc_data)[:, 1:].T.astype(np.float64, order="C")
+        n = closes.shape[0]
         
         indicators = {}
         
+        ema_12 = _ema(closes, 12)
+        ema_26 = _ema(closes, 26)
+        if stream_state is not None:
+            # Incrementally maintained; consumers only read the latest value
+            indicators["ema_12"] = np.array([stream_state["ema_12"]])
+            indicators["ema_26"] = np.array([stream_state["ema_26"]])
+            indicators["rsi"] = np.array([TechnicalIndicators.stream_rsi(stream_state)])
+        else:
+            indicators["ema_12"] = ema_12
+            indicators["ema_26"] = ema_26
+            indicators["rsi"] = _rsi(closes, 14)
+        indicators["ema_50"] = _ema(closes, 50)
+        indicators["ema_200"] = _ema(closes, 200)
+        
+        # MACD reuses the 12/26 EMAs computed above
+        indicators["macd"], indicators["macd_signal"], indicators["macd_histogram"] = _macd(
+            closes, 12, 26, 9, ema_fast=ema_12, ema_slow=ema_26
+        )
+        
+        indicators["atr"] = _atr(highs, lows, closes, 14)
+        indicators["bb_upper"], indicators["bb_middle"], indicators["bb_lower"] = _bollinger(closes, 20, 2)
+        indicators["stoch_k"], indicators["stoch_d"] = _stochastic(highs, lows, closes, 14, 3)
+        indicators["obv"] = _obv(closes, volumes)
+        indicators["volume_sma"] = _sma_loop(volumes, 20)
+        indicators["adx"] = _adx(highs, lows, closes, 20)
+        
+        indicators["support"], indicators["resistance"] = _support_resistance(closes, 20)
+        
+        current_price = float(closes[-1])
+        indicators["current_price"] = current_price
+        
+        indicators["price_change_1h"] = float((current_price - closes[-60]) / closes[-60] * 100) if n >= 60 else 0
+        indicators["price_change_24h"] = float((current_price - closes[0]) / closes[0] * 100) if n > 0 else 0
+        
+        return indicators
+    
+    @staticmethod
+    def calculate_all_indicators(ohlc_data, stream_state: Optional[Dict] = None,
+                                 as_arrays: bool = False) -> Dict[str, any]:
+        """All indicators from one pass over candle dicts or an ohlcv_array; series are lists unless as_arrays is set"""
+        if ohlc_data is None or len(ohlc_data) < 20:
+            return {}
+        
         try:
-            indicators["ema_12"] = TechnicalIndicators.calculate_ema(closes, 12)
-            indicators["ema_26"] = TechnicalIndicators.calculate_ema(closes, 26)
-            indicators["ema_50"] = TechnicalIndicators.calculate_ema(closes, 50)
-            indicators["ema_200"] = TechnicalIndicators.calculate_ema(closes, 200)
-            
-            indicators["rsi"] = TechnicalIndicators.calculate_rsi(closes, 14)
-            
-            macd = TechnicalIndicators.calculate_macd(closes)
-            indicators["macd"] = macd["macd"]
-            indicators["macd_signal"] = macd["signal"]
-            indicators["macd_histogram"] = macd["histogram"]
-            
-            indicators["atr"] = TechnicalIndicators.calculate_atr(highs, lows, closes, 14)
-            
-            bb = TechnicalIndicators.calculate_bollinger_bands(closes, 20, 2)
-            indicators["bb_upper"] = bb["upper"]
-            indicators["bb_middle"] = bb["middle"]
-            indicators["bb_lower"] = bb["lower"]
-            
-            stoch = TechnicalIndicators.calculate_stochastic(highs, lows, closes)
-            indicators["stoch_k"] = stoch["k"]
-            indicators["stoch_d"] = stoch["d"]
-            
-            volume_indicators = TechnicalIndicators.calculate_volume_indicators(closes, volumes)
-            indicators["obv"] = volume_indicators["obv"]
-            indicators["volume_sma"] = volume_indicators["volume_sma"]
-            
-            indicators["adx"] = TechnicalIndicators.calculate_trend_strength(closes, 20)
-            
-            sr = TechnicalIndicators.calculate_support_resistance(closes, 20)
-            indicators["support"] = sr["support"]
-            indicators["resistance"] = sr["resistance"]
-            
-            current_price = closes[-1]
-            indicators["current_price"] = current_price
-            
-            indicators["price_change_1h"] = ((current_price - closes[-60]) / closes[-60] * 100) if len(closes) >= 60 else 0
-            indicators["price_change_24h"] = ((current_price - closes[0]) / closes[0] * 100) if len(closes) > 0 else 0
-            
+            indicators = TechnicalIndicators._compute_arrays(ohlc_data, stream_state)
         except Exception as e:
             print(f"Error calculating indicators: {e}")
             return {}
         
+        if as_arrays:
+            return indicators
+        return {
+            name: values.tolist() if isinstance(values, np.ndarray) else values
+            for name, values in indicators.items()
+        }
+    
+    @staticmethod
+    def cache_stamp(ohlc_data) -> str:
+        if isinstance(ohlc_data, np.ndarray):
+            # A fixed-size window slides its first row on a new bar; an updating bar changes the last row
+            return f"{ohlc_data.shape[0]}:{_bar_id(ohlc_data, 0)}:{_bar_id(ohlc_data, -1)}"
+        # A new bar changes the last timestamp/length; an updating bar changes its close
+        last = ohlc_data[-1]
+        return f"{_candle_ts(last)}:{len(ohlc_data)}:{last.get('close')}"
+    
+    @staticmethod
+    def cached_indicators(instrument: str, ohlc_data) -> Optional[Dict[str, any]]:
+        if ohlc_data is None or len(ohlc_data) == 0:
+            return None
+        key = (instrument, TechnicalIndicators.cache_stamp(ohlc_data))
+        with _indicator_cache_lock:
+            cached = _indicator_cache.get(key)
+            if cached is not None:
+                _indicator_cache.move_to_end(key)
+        return cached
+    
+    @staticmethod
+    def remember_indicators(instrument: str, ohlc_data, indicators: Dict[str, any]):
+        key = (instrument, TechnicalIndicators.cache_stamp(ohlc_data))
+        with _indicator_cache_lock:
+            _indicator_cache[key] = indicators
+            if len(_indicator_cache) > _INDICATOR_CACHE_SIZE:
+                _indicator_cache.popitem(last=False)
+    
+    @staticmethod
+    def calculate_all_indicators_cached(instrument: str, ohlc_data, stream_state: Optional[Dict] = None) -> Dict[str, any]:
+        cached = TechnicalIndicators.cached_indicators(instrument, ohlc_data)
+        if cached is not None:
+            return cached
+        
+        indicators = TechnicalIndicators.calculate_all_indicators(ohlc_data, stream_state, as_arrays=True)
+        if indicators:
+            TechnicalIndicators.remember_indicators(instrument, ohlc_data, indicators)
         return indicators
+    
+    @staticmethod
+    def to_frame(indicators: Dict[str, any], rows: int = 2) -> np.ndarray:
+        """Last `rows` bars of the decision columns as one structured array, right-aligned and NaN-padded"""
+        frame = np.full(rows, np.nan, dtype=_IND_DTYPE)
+        for name in _IND_DTYPE.names:
+            values = indicators.get(name)
+            if values is None or len(values) == 0:
+                continue
+            tail = np.asarray(values[-rows:], dtype=np.float64)
+            frame[name][rows - tail.shape[0]:] = tail
+        return frame
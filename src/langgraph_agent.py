@@ -1,19 +1,38 @@
-from typing import Dict, Any, List, TypedDict
-from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
+from typing import Annotated, Dict, Any, List, Optional, TypedDict
+from langgraph.graph import StateGraph, START, END
+import aiohttp
 import asyncio
 import json
+import logging
+import numpy as np
+import orjson
+import time
 from datetime import datetime
 from anthropic import AsyncAnthropic
 
-from .coindesk_client import CoinDeskClient
+from .coindesk_client import coindesk_client
 from .paper_broker import paper_broker
 from .news_aggregator import news_aggregator
-from .indicators import TechnicalIndicators
+from .agent_nodes import AnalyzeNode
 from .redis_client import redis_client
 from .config import settings
 
 
+# Child of run_system's "trading_system" logger, so records go through its off-thread queue handler
+logger = logging.getLogger(__name__)
+
+COINBASE_WS_URL = "wss://ws-feed.exchange.coinbase.com"
+
+# Settings are immutable at runtime, so risk_node reads plain module constants
+_MAX_POSITION_PCT = settings.max_position_pct
+_LOSS_HALT_PCT = settings.daily_loss_halt_pct * 100
+
+
+def _merge_timing(current: Dict[str, float], update: Dict[str, float]) -> Dict[str, float]:
+    # decide and act each add their own timestamp; the cycle's empty input dict starts from nothing
+    return {**current, **update} if update else {}
+
+
 class TradingState(TypedDict):
     user_id: int
     instrument: str
@@ -21,65 +40,106 @@ class TradingState(TypedDict):
     portfolio: Dict[str, Any]
     research: Dict[str, Any]
     indicators: Dict[str, Any]
+    indicators_last: Dict[str, float]
+    indicators_prev: Dict[str, float]
     risk_checks: Dict[str, Any]
+    risk_ok: bool
     decision: Dict[str, Any]
     action: Dict[str, Any]
     explanation: Dict[str, Any]
-    next_action: str
+    timing: Annotated[Dict[str, float], _merge_timing]
+    trading_mode: str
+
 
+# Nodes return only the keys they change; LangGraph merges the delta into the state
 
-async def collect_node(state: TradingState) -> TradingState:
+async def fetch_market_node(state: TradingState) -> Dict[str, Any]:
     try:
-        async with CoinDeskClient() as client:
-            market_data = await client.get_market_summary([state["instrument"]])
-            state["market_data"] = market_data.get(state["instrument"], {})
-            
-            portfolio = await paper_broker.get_portfolio_summary(state["user_id"])
-            state["portfolio"] = portfolio
-            
-            news_items = await news_aggregator.get_news_for_symbol(state["instrument"], limit=20)
-            news_summary = news_aggregator.get_news_summary(news_items, top_k=5)
-            state["research"] = news_summary
-            
-            redis_client.set_market_data(state["instrument"], state["market_data"], ttl=60)
-            redis_client.set_portfolio_data(str(state["user_id"]), state["portfolio"], ttl=30)
-            
-    except Exception as e:
-        print(f"Collect node error: {e}")
-        state["market_data"] = {}
-        state["portfolio"] = {}
-        state["research"] = {}
-    
-    state["next_action"] = "analyze"
-    return state
+        market_data = await coindesk_client.get_market_summary([state["instrument"]])
+        # get_market_summary already cached market:{instrument} when it fetched, so no second write here
+        market_data = market_data.get(state["instrument"]) or {}
+    except Exception:
+        logger.exception("collect_market_error")
+        market_data = {}
+    return {"market_data": market_data}
 
 
-async def analyze_node(state: TradingState) -> TradingState:
+async def fetch_portfolio_node(state: TradingState) -> Dict[str, Any]:
     try:
-        if not state["market_data"] or not state["market_data"].get("ohlc_1h"):
-            state["indicators"] = {}
-            state["next_action"] = "risk"
-            return state
-        
-        ohlc_data = state["market_data"].get("ohlc_1h", [])
-        if not ohlc_data:
-            ohlc_data = state["market_data"].get("ohlc_1d", [])
-        
-        if ohlc_data:
-            indicators = TechnicalIndicators.calculate_all_indicators(ohlc_data)
-            state["indicators"] = indicators
-        else:
-            state["indicators"] = {}
+        portfolio = await paper_broker.get_portfolio_summary(state["user_id"])
+        # Cache fill only; the cycle doesn't wait for Redis to acknowledge it
+        redis_client.write_behind(redis_client.set_portfolio_data, str(state["user_id"]), portfolio, ttl=30)
+    except Exception:
+        logger.exception("collect_portfolio_error")
+        portfolio = {}
+    return {"portfolio": portfolio}
+
+
+async def fetch_news_node(state: TradingState) -> Dict[str, Any]:
+    try:
+        news_items = await news_aggregator.get_news_for_symbol(state["instrument"], limit=20)
+        research = news_aggregator.get_news_summary(news_items, top_k=5)
+    except Exception:
+        logger.exception("collect_news_error")
+        research = {}
+    return {"research": research}
+
+
+def _tail(indicators: Dict[str, Any], offset: int) -> Dict[str, float]:
+    # Series with fewer than `offset` bars are left out, which the readers treat as "N/A"
+    return {
+        name: values[-offset] for name, values in indicators.items()
+        if isinstance(values, list) and len(values) >= offset
+    }
+
+
+def _indicator_update(indicators: Dict[str, Any]) -> Dict[str, Any]:
+    # Latest and previous bar scalars, taken once here instead of re-indexing the series downstream
+    return {"indicators": indicators, "indicators_last": _tail(indicators, 1), "indicators_prev": _tail(indicators, 2)}
+
+
+async def analyze_node(state: TradingState) -> Dict[str, Any]:
+    try:
+        if not state["market_data"]:
+            return _indicator_update({})
+        
+        # Packed (N, 5) OHLCV history, whose columns feed the JIT kernels without per-bar dicts;
+        # same stream-state and LRU -> Redis -> compute path as AnalyzeNode
+        ohlcv = await AnalyzeNode.load_history(state["instrument"])
+        if ohlcv is None:
+            return _indicator_update({})
+        
+        stream_state = await AnalyzeNode.load_stream_state(state["instrument"], ohlcv)
+        indicators = await AnalyzeNode.load_indicators(state["instrument"], ohlcv, stream_state)
+        # The graph state keeps plain lists
+        return _indicator_update({
+            name: values.tolist() if isinstance(values, np.ndarray) else values
+            for name, values in indicators.items()
+        })
             
-    except Exception as e:
-        print(f"Analyze node error: {e}")
-        state["indicators"] = {}
-    
-    state["next_action"] = "risk"
-    return state
+    except Exception:
+        logger.exception("analyze_error")
+        return _indicator_update({})
+
+
+def _hold(risk_checks: Dict[str, Any], reason: str) -> Dict[str, Any]:
+    """risk_node result for a cycle that can only hold; the graph routes it straight to explain"""
+    return {
+        "risk_checks": risk_checks,
+        "risk_ok": False,
+        "decision": {
+            "action": "hold",
+            "quantity": 0,
+            "confidence": 0.0,
+            "reasoning": [reason],
+            "risk_assessment": "high",
+            "market_outlook": "neutral"
+        },
+        "action": {"executed": False, "order_id": None, "fills": [], "error": None}
+    }
 
 
-async def risk_node(state: TradingState) -> TradingState:
+async def risk_node(state: TradingState) -> Dict[str, Any]:
     try:
         risk_checks = {
             "max_position_check": True,
@@ -93,49 +153,70 @@ async def risk_node(state: TradingState) -> TradingState:
         indicators = state["indicators"]
         research = state["research"]
         
-        if not portfolio or not indicators:
-            state["risk_checks"] = risk_checks
-            state["next_action"] = "decide"
-            return state
+        if not state["market_data"] or not portfolio or not indicators:
+            return _hold(risk_checks, "Insufficient market or portfolio data")
         
         current_price = indicators.get("current_price", 0)
         if current_price <= 0:
-            state["risk_checks"] = risk_checks
-            state["next_action"] = "decide"
-            return state
+            return _hold(risk_checks, "No valid current price")
         
         total_value = portfolio.get("total_value", 0)
-        current_position_value = 0
-        for position in portfolio.get("positions", []):
-            if position["instrument"] == state["instrument"]:
-                current_position_value = position["market_value"]
-                break
+        position = portfolio.get("positions_by_instrument", {}).get(state["instrument"])
+        current_position_value = position["market_value"] if position else 0
         
         position_pct = current_position_value / total_value if total_value > 0 else 0
-        risk_checks["max_position_check"] = position_pct <= settings.max_position_pct
+        risk_checks["max_position_check"] = position_pct <= _MAX_POSITION_PCT
         
         pnl_pct = portfolio.get("pnl_pct", 0)
-        risk_checks["daily_loss_check"] = pnl_pct >= -settings.daily_loss_halt_pct * 100
+        risk_checks["daily_loss_check"] = pnl_pct >= -_LOSS_HALT_PCT
         
-        atr = indicators.get("atr", [])
-        if atr and len(atr) > 0:
-            current_atr = atr[-1]
+        current_atr = state["indicators_last"].get("atr")
+        if current_atr is not None:
             volatility_threshold = current_price * 0.05
             risk_checks["volatility_check"] = current_atr <= volatility_threshold
         
         if research and research.get("high_impact_news"):
-            high_impact_news = research["high_impact_news"]
-            negative_news = [item for item in high_impact_news if item.get("sentiment", 0) < -0.3]
-            risk_checks["news_shock_check"] = len(negative_news) == 0
+            risk_checks["news_shock_check"] = not any(
+                item.get("sentiment", 0) < -0.3 for item in research["high_impact_news"]
+            )
         
-        state["risk_checks"] = risk_checks
+        if not all(risk_checks.values()):
+            return _hold(risk_checks, "Risk checks failed")
+        return {"risk_checks": risk_checks, "risk_ok": True}
         
     except Exception as e:
-        print(f"Risk node error: {e}")
-        state["risk_checks"] = {"error": str(e)}
-    
-    state["next_action"] = "decide"
-    return state
+        logger.exception("risk_error")
+        # An error entry is truthy, so the flag (not the dict) is what keeps the cycle on hold
+        return _hold({"error": str(e)}, f"Error: {str(e)}")
+
+
+def _route_after_risk(state: TradingState) -> str:
+    # A failed check makes decide and act no-ops, so skip both
+    return "decide" if state["risk_ok"] else "explain"
+
+
+# Identical on every call, so it goes first and is marked for prompt caching
+_SYSTEM_PROMPT = """You are an expert cryptocurrency trading agent. Always respond with valid JSON.
+
+Each request describes the current situation for one instrument. Based on that analysis, provide a trading decision in this exact JSON format:
+{
+    "action": "buy|sell|hold",
+    "quantity": <number>,
+    "confidence": <0.0-1.0>,
+    "reasoning": ["reason1", "reason2", "reason3"],
+    "risk_assessment": "low|medium|high",
+    "market_outlook": "bullish|bearish|neutral"
+}
+
+Consider:
+1. Technical indicators and their signals
+2. News sentiment and market conditions
+3. Risk management and position sizing
+4. Current portfolio allocation
+5. Market volatility and liquidity
+
+Only recommend trades if confidence > 0.6 and risk_assessment is "low" or "medium".
+"""
 
 
 async def llm_analyze_and_decide(state: TradingState) -> Dict[str, Any]:
@@ -146,15 +227,16 @@ async def llm_analyze_and_decide(state: TradingState) -> Dict[str, Any]:
         "instrument": state["instrument"],
         "current_price": state["market_data"].get("price", 0),
         "indicators": state["indicators"],
+        "indicators_last": state["indicators_last"],
+        "indicators_prev": state["indicators_prev"],
         "portfolio": state["portfolio"],
         "research": state["research"],
         "risk_checks": state["risk_checks"],
-        "trading_mode": settings.trading_mode
+        "trading_mode": state.get("trading_mode") or settings.trading_mode
     }
     
-    # Create prompt for LLM
-    prompt = f"""
-You are an expert cryptocurrency trading agent analyzing {context['instrument']}.
+    # Only the situation changes per cycle; the instructions live in the cacheable _SYSTEM_PROMPT
+    prompt = f"""INSTRUMENT: {context['instrument']}
 
 CURRENT SITUATION:
 - Price: ${context['current_price']}
@@ -163,11 +245,11 @@ CURRENT SITUATION:
 - P&L: {context['portfolio'].get('pnl_pct', 0):.2f}%
 
 TECHNICAL INDICATORS:
-- RSI: {context['indicators'].get('rsi', [0])[-1] if context['indicators'].get('rsi') else 'N/A'}
-- MACD: {context['indicators'].get('macd', [0])[-1] if context['indicators'].get('macd') else 'N/A'}
-- EMA 12: {context['indicators'].get('ema_12', [0])[-1] if context['indicators'].get('ema_12') else 'N/A'}
-- EMA 26: {context['indicators'].get('ema_26', [0])[-1] if context['indicators'].get('ema_26') else 'N/A'}
-- ATR: {context['indicators'].get('atr', [0])[-1] if context['indicators'].get('atr') else 'N/A'}
+- RSI: {context['indicators_last'].get('rsi', 'N/A')}
+- MACD: {context['indicators_last'].get('macd', 'N/A')}
+- EMA 12: {context['indicators_last'].get('ema_12', 'N/A')}
+- EMA 26: {context['indicators_last'].get('ema_26', 'N/A')}
+- ATR: {context['indicators_last'].get('atr', 'N/A')}
 
 NEWS SENTIMENT:
 - Average Sentiment: {context['research'].get('avg_sentiment', 0):.3f}
@@ -178,25 +260,6 @@ RISK CHECKS:
 {json.dumps(context['risk_checks'], indent=2)}
 
 TRADING MODE: {context['trading_mode'].upper()}
-
-Based on this analysis, provide a trading decision in this exact JSON format:
-{{
-    "action": "buy|sell|hold",
-    "quantity": <number>,
-    "confidence": <0.0-1.0>,
-    "reasoning": ["reason1", "reason2", "reason3"],
-    "risk_assessment": "low|medium|high",
-    "market_outlook": "bullish|bearish|neutral"
-}}
-
-Consider:
-1. Technical indicators and their signals
-2. News sentiment and market conditions
-3. Risk management and position sizing
-4. Current portfolio allocation
-5. Market volatility and liquidity
-
-Only recommend trades if confidence > 0.6 and risk_assessment is "low" or "medium".
 """
 
     try:
@@ -206,7 +269,8 @@ Only recommend trades if confidence > 0.6 and risk_assessment is "low" or "mediu
             response = await client.chat.completions.create(
                 model=settings.llm_model,
                 messages=[
-                    {"role": "system", "content": "You are a professional cryptocurrency trading agent. Always respond with valid JSON."},
+                    # Static system message first, so OpenAI's automatic prefix caching can match it
+                    {"role": "system", "content": _SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
@@ -220,10 +284,15 @@ Only recommend trades if confidence > 0.6 and risk_assessment is "low" or "mediu
                 model="claude-3-sonnet-20240229",
                 max_tokens=500,
                 temperature=0.1,
+                system=[{"type": "text", "text": _SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
                 messages=[
                     {"role": "user", "content": prompt}
                 ]
             )
+            logger.debug("llm_usage", extra={
+                "input_tokens": response.usage.input_tokens,
+                "cache_read_input_tokens": getattr(response.usage, "cache_read_input_tokens", None)
+            })
             llm_response = response.content[0].text
         else:
             # Fallback to rule-based system
@@ -234,11 +303,11 @@ Only recommend trades if confidence > 0.6 and risk_assessment is "low" or "mediu
             decision = json.loads(llm_response.strip())
             return decision
         except json.JSONDecodeError:
-            print(f"Failed to parse LLM response: {llm_response}")
+            logger.warning("llm_unparseable_response", extra={"response": llm_response})
             return fallback_decision_logic(context)
             
-    except Exception as e:
-        print(f"LLM decision error: {e}")
+    except Exception:
+        logger.exception("llm_decision_error")
         return fallback_decision_logic(context)
 
 
@@ -254,6 +323,8 @@ def fallback_decision_logic(context: Dict[str, Any]) -> Dict[str, Any]:
     }
     
     indicators = context["indicators"]
+    last = context["indicators_last"]
+    prev = context["indicators_prev"]
     research = context["research"]
     portfolio = context["portfolio"]
     current_price = context["current_price"]
@@ -266,9 +337,8 @@ def fallback_decision_logic(context: Dict[str, Any]) -> Dict[str, Any]:
     reasoning = []
     
     # RSI analysis
-    rsi = indicators.get("rsi", [])
-    if rsi and len(rsi) > 0:
-        current_rsi = rsi[-1]
+    current_rsi = last.get("rsi")
+    if current_rsi is not None:
         if current_rsi < 30:
             signal_score += 0.3
             reasoning.append(f"RSI oversold: {current_rsi:.2f}")
@@ -277,13 +347,11 @@ def fallback_decision_logic(context: Dict[str, Any]) -> Dict[str, Any]:
             reasoning.append(f"RSI overbought: {current_rsi:.2f}")
     
     # MACD analysis
-    macd = indicators.get("macd", [])
-    macd_signal = indicators.get("macd_signal", [])
-    if macd and macd_signal and len(macd) > 1 and len(macd_signal) > 1:
-        if macd[-1] > macd_signal[-1] and macd[-2] <= macd_signal[-2]:
+    if "macd" in prev and "macd_signal" in prev:
+        if last["macd"] > last["macd_signal"] and prev["macd"] <= prev["macd_signal"]:
             signal_score += 0.2
             reasoning.append("MACD bullish crossover")
-        elif macd[-1] < macd_signal[-1] and macd[-2] >= macd_signal[-2]:
+        elif last["macd"] < last["macd_signal"] and prev["macd"] >= prev["macd_signal"]:
             signal_score -= 0.2
             reasoning.append("MACD bearish crossover")
     
@@ -306,11 +374,8 @@ def fallback_decision_logic(context: Dict[str, Any]) -> Dict[str, Any]:
         decision["confidence"] = min(signal_score, 1.0)
         decision["market_outlook"] = "bullish"
     elif signal_score < -0.3:
-        current_position = 0
-        for position in portfolio.get("positions", []):
-            if position["instrument"] == context["instrument"]:
-                current_position = position["quantity"]
-                break
+        position = portfolio.get("positions_by_instrument", {}).get(context["instrument"])
+        current_position = position["quantity"] if position else 0
         
         if current_position > 0:
             decision["action"] = "sell"
@@ -322,27 +387,14 @@ def fallback_decision_logic(context: Dict[str, Any]) -> Dict[str, Any]:
     return decision
 
 
-async def decide_node(state: TradingState) -> TradingState:
+async def decide_node(state: TradingState) -> Dict[str, Any]:
     try:
-        if not state["risk_checks"] or not all(state["risk_checks"].values()):
-            state["decision"] = {
-                "action": "hold",
-                "quantity": 0,
-                "confidence": 0.0,
-                "reasoning": ["Risk checks failed"],
-                "risk_assessment": "high",
-                "market_outlook": "neutral"
-            }
-            state["next_action"] = "act"
-            return state
-        
-        # Use LLM for decision making
+        # Only reached once risk passed; failed cycles already carry risk_node's hold decision
         decision = await llm_analyze_and_decide(state)
-        state["decision"] = decision
         
     except Exception as e:
-        print(f"Decide node error: {e}")
-        state["decision"] = {
+        logger.exception("decide_error")
+        decision = {
             "action": "hold", 
             "quantity": 0, 
             "confidence": 0.0, 
@@ -351,11 +403,10 @@ async def decide_node(state: TradingState) -> TradingState:
             "market_outlook": "neutral"
         }
     
-    state["next_action"] = "act"
-    return state
+    return {"decision": decision, "timing": {"decided_at": time.perf_counter()}}
 
 
-async def act_node(state: TradingState) -> TradingState:
+async def act_node(state: TradingState) -> Dict[str, Any]:
     try:
         action = {
             "executed": False,
@@ -366,9 +417,7 @@ async def act_node(state: TradingState) -> TradingState:
         
         decision = state["decision"]
         if not decision or decision["action"] == "hold" or decision["quantity"] <= 0:
-            state["action"] = action
-            state["next_action"] = "explain"
-            return state
+            return {"action": action, "timing": {"executed_at": time.perf_counter()}}
         
         instrument = state["instrument"]
         side = decision["action"]
@@ -387,126 +436,109 @@ async def act_node(state: TradingState) -> TradingState:
             action["order_id"] = order_result["order_id"]
             action["fills"] = order_result["fills"]
             
-            redis_client.invalidate_portfolio_cache(str(state["user_id"]))
+            await asyncio.to_thread(redis_client.invalidate_portfolio_cache, str(state["user_id"]))
             
         except Exception as e:
             action["error"] = str(e)
-            print(f"Order execution error: {e}")
-        
-        state["action"] = action
+            logger.exception("order_execution_error")
         
     except Exception as e:
-        print(f"Act node error: {e}")
-        state["action"] = {"executed": False, "order_id": None, "fills": [], "error": str(e)}
+        logger.exception("act_error")
+        action = {"executed": False, "order_id": None, "fills": [], "error": str(e)}
     
-    state["next_action"] = "explain"
-    return state
+    return {"action": action, "timing": {"executed_at": time.perf_counter()}}
+
+
+# Fields copied into every explanation; the indicator values come from analyze's last-bar map
+_EXPLAIN_PORTFOLIO_FIELDS = ("cash_balance", "total_value", "pnl_pct")
+_EXPLAIN_INDICATORS = ("rsi", "macd", "ema_12", "ema_26", "atr")
 
 
-async def explain_node(state: TradingState) -> TradingState:
+async def explain_node(state: TradingState) -> Dict[str, Any]:
     try:
+        market_data = state["market_data"]
+        portfolio = state["portfolio"]
+        research = state["research"]
+        indicators_last = state["indicators_last"]
+        
         explanation = {
             "timestamp": datetime.utcnow().isoformat(),
             "instrument": state["instrument"],
             "market_data": {
-                "price": state["market_data"].get("price", 0),
-                "ohlc_1h": state["market_data"].get("ohlc_1h", [{}])[0] if state["market_data"].get("ohlc_1h") else {},
-                "ohlc_1d": state["market_data"].get("ohlc_1d", [{}])[0] if state["market_data"].get("ohlc_1d") else {}
-            },
-            "portfolio": {
-                "cash_balance": state["portfolio"].get("cash_balance", 0),
-                "total_value": state["portfolio"].get("total_value", 0),
-                "pnl_pct": state["portfolio"].get("pnl_pct", 0)
-            },
-            "indicators": {
-                "rsi": state["indicators"].get("rsi", [0])[-1] if state["indicators"].get("rsi") else 0,
-                "macd": state["indicators"].get("macd", [0])[-1] if state["indicators"].get("macd") else 0,
-                "ema_12": state["indicators"].get("ema_12", [0])[-1] if state["indicators"].get("ema_12") else 0,
-                "ema_26": state["indicators"].get("ema_26", [0])[-1] if state["indicators"].get("ema_26") else 0,
-                "atr": state["indicators"].get("atr", [0])[-1] if state["indicators"].get("atr") else 0
+                "price": market_data.get("price", 0),
+                # The summary holds each latest bar as a single dict
+                "ohlc_1h": market_data.get("ohlc_1h") or {},
+                "ohlc_1d": market_data.get("ohlc_1d") or {}
             },
+            "portfolio": {field: portfolio.get(field, 0) for field in _EXPLAIN_PORTFOLIO_FIELDS},
+            "indicators": {name: indicators_last.get(name, 0) for name in _EXPLAIN_INDICATORS},
             "research": {
-                "avg_sentiment": state["research"].get("avg_sentiment", 0),
-                "news_count": len(state["research"].get("items", [])),
-                "high_impact_news": state["research"].get("high_impact_news", [])
+                "avg_sentiment": research.get("avg_sentiment", 0),
+                "news_count": len(research.get("items", ())),
+                "high_impact_news": research.get("high_impact_news", [])
             },
             "risk_checks": state["risk_checks"],
             "decision": state["decision"],
             "action": state["action"]
         }
         
-        state["explanation"] = explanation
-        
     except Exception as e:
-        print(f"Explain node error: {e}")
-        state["explanation"] = {"error": str(e), "timestamp": datetime.utcnow().isoformat()}
+        logger.exception("explain_error")
+        explanation = {"error": str(e), "timestamp": datetime.utcnow().isoformat()}
     
-    state["next_action"] = END
-    return state
-
-
-def should_continue(state: TradingState) -> str:
-    return state.get("next_action", END)
+    return {"explanation": explanation}
 
 
 class LangGraphTradingAgent:
+    # The graph is the same for every agent, so it is compiled once. No checkpointer: every cycle
+    # starts from a full initial state and nothing resumes, so saved checkpoints would only pile up
+    _APP = None
+    
     def __init__(self, user_id: int, instrument: str = "XBX-USD"):
         self.user_id = user_id
         self.instrument = instrument
-        self.workflow = self._create_workflow()
-        self.app = self.workflow.compile(checkpointer=MemorySaver())
+        self.app = self._shared_app()
+        self._tick_event = asyncio.Event()
+        self._tick_task: Optional[asyncio.Task] = None
+        self._data_ready_at: Optional[float] = None
+        self._decision_lag: Optional[float] = None
+        self._execution_lag: Optional[float] = None
+    
+    @classmethod
+    def _shared_app(cls):
+        if cls._APP is None:
+            cls._APP = cls._create_workflow().compile()
+        return cls._APP
     
-    def _create_workflow(self) -> StateGraph:
+    @staticmethod
+    def _create_workflow() -> StateGraph:
         workflow = StateGraph(TradingState)
         
-        workflow.add_node("collect", collect_node)
+        workflow.add_node("fetch_market", fetch_market_node)
+        workflow.add_node("fetch_portfolio", fetch_portfolio_node)
+        workflow.add_node("fetch_news", fetch_news_node)
         workflow.add_node("analyze", analyze_node)
         workflow.add_node("risk", risk_node)
         workflow.add_node("decide", decide_node)
         workflow.add_node("act", act_node)
         workflow.add_node("explain", explain_node)
         
-        workflow.set_entry_point("collect")
-        
-        workflow.add_conditional_edges(
-            "collect",
-            should_continue,
-            {"analyze": "analyze", END: END}
-        )
-        
-        workflow.add_conditional_edges(
-            "analyze",
-            should_continue,
-            {"risk": "risk", END: END}
-        )
-        
-        workflow.add_conditional_edges(
-            "risk",
-            should_continue,
-            {"decide": "decide", END: END}
-        )
+        # Fan out the independent fetches; analyze follows the market leg and risk waits for all branches
+        workflow.add_edge(START, "fetch_market")
+        workflow.add_edge(START, "fetch_portfolio")
+        workflow.add_edge(START, "fetch_news")
+        workflow.add_edge("fetch_market", "analyze")
+        workflow.add_edge(["analyze", "fetch_portfolio", "fetch_news"], "risk")
         
-        workflow.add_conditional_edges(
-            "decide",
-            should_continue,
-            {"act": "act", END: END}
-        )
-        
-        workflow.add_conditional_edges(
-            "act",
-            should_continue,
-            {"explain": "explain", END: END}
-        )
-        
-        workflow.add_conditional_edges(
-            "explain",
-            should_continue,
-            {END: END}
-        )
+        # Only a cycle that passed risk reaches decide/act; the rest hold and go straight to explain
+        workflow.add_conditional_edges("risk", _route_after_risk, ["decide", "explain"])
+        workflow.add_edge("decide", "act")
+        workflow.add_edge("act", "explain")
+        workflow.add_edge("explain", END)
         
         return workflow
     
-    async def execute_cycle(self) -> Dict[str, Any]:
+    async def execute_cycle(self, mode: Optional[str] = None) -> Dict[str, Any]:
         initial_state = TradingState(
             user_id=self.user_id,
             instrument=self.instrument,
@@ -514,37 +546,126 @@ class LangGraphTradingAgent:
             portfolio={},
             research={},
             indicators={},
+            indicators_last={},
+            indicators_prev={},
             risk_checks={},
+            risk_ok=False,
             decision={},
             action={},
             explanation={},
-            next_action="collect"
+            timing={},
+            trading_mode=mode or settings.trading_mode
         )
         
-        config = {"configurable": {"thread_id": f"user_{self.user_id}"}}
+        # Lags are measured from when new data triggered the cycle, or from now for ad-hoc runs
+        data_ready_at = self._data_ready_at or time.perf_counter()
+        self._data_ready_at = None
         
         try:
-            result = await self.app.ainvoke(initial_state, config=config)
+            result = await self.app.ainvoke(initial_state)
+            timing = result.get("timing", {})
+            decided_at = timing.get("decided_at")
+            executed_at = timing.get("executed_at")
+            self._decision_lag = decided_at - data_ready_at if decided_at else None
+            self._execution_lag = executed_at - decided_at if decided_at and executed_at else None
             return {
                 "state": result,
                 "success": result.get("action", {}).get("executed", False)
             }
         except Exception as e:
-            print(f"LangGraph execution error: {e}")
+            logger.exception("execution_error")
             return {
                 "state": initial_state,
                 "success": False,
                 "error": str(e)
             }
     
+    def start_tick_listener(self, product_id: str = "BTC-USD", threshold: float = 0.002) -> asyncio.Task:
+        """Start streaming ticker prices; wake wait_for_tick() on moves larger than threshold"""
+        if self._tick_task is None or self._tick_task.done():
+            self._tick_task = asyncio.create_task(self._listen_ticks(product_id, threshold))
+        return self._tick_task
+    
+    async def stop_tick_listener(self):
+        if self._tick_task and not self._tick_task.done():
+            self._tick_task.cancel()
+            try:
+                await self._tick_task
+            except asyncio.CancelledError:
+                pass
+        self._tick_task = None
+    
+    async def _listen_ticks(self, product_id: str, threshold: float):
+        subscribe_message = {"type": "subscribe", "product_ids": [product_id], "channels": ["ticker"]}
+        last_price = None
+        
+        while True:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(COINBASE_WS_URL, heartbeat=30) as ws:
+                        await ws.send_str(orjson.dumps(subscribe_message).decode())
+                        
+                        async for message in ws:
+                            if message.type != aiohttp.WSMsgType.TEXT:
+                                continue
+                            
+                            data = orjson.loads(message.data)
+                            if data.get("type") != "ticker" or "price" not in data:
+                                continue
+                            
+                            price = float(data["price"])
+                            if last_price is None:
+                                last_price = price
+                            elif abs(price - last_price) / last_price > threshold:
+                                last_price = price
+                                if not self._tick_event.is_set():
+                                    self._data_ready_at = time.perf_counter()
+                                self._tick_event.set()
+                                
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("tick_listener_error")
+            
+            await asyncio.sleep(5)
+    
+    async def wait_for_tick(self, timeout: float = 300) -> bool:
+        """Wait for a significant price move; returns False if the heartbeat timeout elapsed first"""
+        try:
+            await asyncio.wait_for(self._tick_event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._tick_event.clear()
+    
+    def get_decision_lag(self) -> Optional[float]:
+        """Seconds from the data that triggered the last cycle to its trading decision"""
+        return self._decision_lag
+    
+    def get_execution_lag(self) -> Optional[float]:
+        """Seconds from the last cycle's decision to its order being placed"""
+        return self._execution_lag
+    
     async def run_continuous(self, interval_seconds: int = 300):
+        # Fixed-rate schedule on the monotonic clock so cycle runtime does not accumulate as drift.
+        # The first cycle runs now; later slots land on wall-clock multiples of the interval (candle closes)
+        next_run = time.monotonic() + (-time.time() % interval_seconds) - interval_seconds
+        failures = 0
         while True:
             try:
                 result = await self.execute_cycle()
-                print(f"Trading cycle completed: {result['success']}")
-                if result.get("error"):
-                    print(f"Error: {result['error']}")
-            except Exception as e:
-                print(f"Trading cycle error: {e}")
+                logger.info("cycle_completed", extra={"success": result["success"], "error": result.get("error")})
+                failures = failures + 1 if result.get("error") else 0
+            except Exception:
+                logger.exception("cycle_error")
+                failures += 1
             
-            await asyncio.sleep(interval_seconds)
+            # Consecutive failures double the wait (up to 32 intervals) instead of retrying at full rate
+            next_run += interval_seconds * 2 ** min(failures, 5)
+            now = time.monotonic()
+            if now > next_run:
+                missed = int((now - next_run) // interval_seconds) + 1
+                logger.warning("cycle_overran", extra={"skipped_slots": missed})
+                next_run += missed * interval_seconds
+            await asyncio.sleep(next_run - now)
@@ -0,0 +1,208 @@
+import asyncio
+import orjson
+import os
+import socket
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Set, Tuple
+from redis.exceptions import ResponseError
+from sqlalchemy import DateTime, Numeric
+from .database import DecisionLog, Signal, bulk_insert
+from .redis_client import redis_client
+
+
+# Redis stream per table; the drainer copies entries into Postgres in batches
+STREAMS = {
+    "decision_log_stream": DecisionLog,
+    "signal_stream": Signal
+}
+_STREAM_MAXLEN = 100000
+
+# Every process runs a drainer; the consumer group hands each entry to exactly one of them
+_GROUP = "log_writers"
+_CONSUMER = f"{socket.gethostname()}:{os.getpid()}"
+# Entries unacknowledged this long are retried; after _MAX_DELIVERIES they move to "<stream>:dead"
+_RETRY_IDLE_MS = 30000
+_MAX_DELIVERIES = 5
+
+# Strong references so queued writes are not garbage collected mid-flight
+_pending: Set[asyncio.Task] = set()
+_drainer: Optional[asyncio.Task] = None
+
+
+def _to_row(model, record: Dict[str, Any]) -> Dict[str, Any]:
+    # Records travel as JSON; restore the types asyncpg's COPY codecs expect
+    row = dict(record)
+    for column in model.__table__.columns:
+        value = row.get(column.name)
+        if value is None:
+            continue
+        if isinstance(column.type, DateTime):
+            row[column.name] = datetime.fromisoformat(value)
+        elif isinstance(column.type, Numeric):
+            row[column.name] = Decimal(str(value))
+    return row
+
+
+async def _enqueue(stream: str, record: Dict[str, Any]):
+    try:
+        await asyncio.to_thread(
+            redis_client.redis.xadd, stream, {"data": orjson.dumps(record)},
+            maxlen=_STREAM_MAXLEN, approximate=True
+        )
+    except Exception as e:
+        print(f"Log stream error, writing {stream} directly: {e}")
+        try:
+            model = STREAMS[stream]
+            await bulk_insert(model, [_to_row(model, record)])
+        except Exception as e:
+            print(f"Log insert error: {e}")
+
+
+def _log(stream: str, record: Dict[str, Any]):
+    record = {**record, "created_at": record.get("created_at") or datetime.utcnow().isoformat()}
+    task = asyncio.create_task(_enqueue(stream, record))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def log_decision(record: Dict[str, Any]):
+    """Queue a decision_log row without waiting on Redis or Postgres"""
+    _log("decision_log_stream", record)
+
+
+def log_signal(record: Dict[str, Any]):
+    """Queue a signal row without waiting on Redis or Postgres"""
+    _log("signal_stream", record)
+
+
+def _ensure_groups():
+    for stream in STREAMS:
+        try:
+            # "0" so entries queued before the group existed are still delivered
+            redis_client.redis.xgroup_create(stream, _GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+
+def _acknowledge(stream: str, message_ids: List[str]):
+    pipe = redis_client.redis.pipeline(transaction=False)
+    pipe.xack(stream, _GROUP, *message_ids)
+    pipe.xdel(stream, *message_ids)
+    pipe.execute()
+
+
+def _dead_letter(stream: str, messages: List[Tuple[str, Dict]]):
+    pipe = redis_client.redis.pipeline(transaction=False)
+    for message_id, fields in messages:
+        pipe.xadd(f"{stream}:dead", {**fields, "message_id": message_id}, maxlen=_STREAM_MAXLEN, approximate=True)
+    pipe.xack(stream, _GROUP, *[message_id for message_id, _ in messages])
+    pipe.xdel(stream, *[message_id for message_id, _ in messages])
+    pipe.execute()
+
+
+async def _store(stream: str, messages: List[Tuple[str, Dict]]):
+    """Insert entries and acknowledge the ones that landed; failures stay pending for retry"""
+    model = STREAMS[stream]
+    message_ids, rows = [], []
+    for message_id, fields in messages:
+        try:
+            rows.append(_to_row(model, orjson.loads(fields["data"])))
+            message_ids.append(message_id)
+        except Exception as e:
+            print(f"Log decode error for {stream} {message_id}: {e}")
+    
+    try:
+        await bulk_insert(model, rows)
+        stored = message_ids
+    except Exception as e:
+        # One bad row fails the whole batch; insert singly so only that row is held back
+        print(f"Log batch insert error for {stream}, retrying rows singly: {e}")
+        stored = []
+        for message_id, row in zip(message_ids, rows):
+            try:
+                await bulk_insert(model, [row])
+                stored.append(message_id)
+            except Exception as e:
+                print(f"Log insert error for {stream} {message_id}: {e}")
+    
+    # Acknowledge only after the insert commits, so a crash replays entries instead of losing them
+    if stored:
+        await asyncio.to_thread(_acknowledge, stream, stored)
+
+
+async def _retry_pending(stream: str, batch_size: int):
+    # Stale entries are this consumer's failures or were read by a drainer that died
+    pending = await asyncio.to_thread(
+        redis_client.redis.xpending_range, stream, _GROUP, "-", "+", batch_size, idle=_RETRY_IDLE_MS
+    )
+    if not pending:
+        return
+    
+    exhausted = {entry["message_id"] for entry in pending if entry["times_delivered"] >= _MAX_DELIVERIES}
+    claimed = await asyncio.to_thread(
+        redis_client.redis.xclaim, stream, _GROUP, _CONSUMER, _RETRY_IDLE_MS,
+        [entry["message_id"] for entry in pending]
+    )
+    # Entries trimmed from the stream come back without fields; just clear them
+    gone = [message_id for message_id, fields in claimed if not fields]
+    if gone:
+        await asyncio.to_thread(_acknowledge, stream, gone)
+    
+    dead = [(message_id, fields) for message_id, fields in claimed if fields and message_id in exhausted]
+    if dead:
+        print(f"Log entries moved to {stream}:dead after {_MAX_DELIVERIES} attempts: {len(dead)}")
+        await asyncio.to_thread(_dead_letter, stream, dead)
+    
+    retry = [(message_id, fields) for message_id, fields in claimed if fields and message_id not in exhausted]
+    if retry:
+        await _store(stream, retry)
+
+
+async def drain_logs(batch_size: int = 500, block_ms: int = 100):
+    """Copy queued records into Postgres until cancelled; any number of processes can drain at once"""
+    streams = {stream: ">" for stream in STREAMS}
+    groups_ready = False
+    next_retry = 0.0
+    while True:
+        try:
+            if not groups_ready:
+                await asyncio.to_thread(_ensure_groups)
+                groups_ready = True
+            
+            if time.monotonic() >= next_retry:
+                next_retry = time.monotonic() + _RETRY_IDLE_MS / 1000
+                for stream in STREAMS:
+                    await _retry_pending(stream, batch_size)
+            
+            entries = await asyncio.to_thread(
+                redis_client.redis.xreadgroup, _GROUP, _CONSUMER, streams, count=batch_size, block=block_ms
+            )
+            for stream, messages in entries or []:
+                await _store(stream, messages)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Log drain error: {e}")
+            await asyncio.sleep(1)
+
+
+def start_drainer():
+    global _drainer
+    if _drainer is None or _drainer.done():
+        _drainer = asyncio.create_task(drain_logs())
+
+
+async def stop_drainer():
+    global _drainer
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
+    if _drainer:
+        _drainer.cancel()
+        try:
+            await _drainer
+        except asyncio.CancelledError:
+            pass
+        _drainer = None
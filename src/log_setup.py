@@ -0,0 +1,52 @@
+import logging
+import logging.handlers
+import queue
+from pathlib import Path
+from typing import Optional
+from pythonjsonlogger import jsonlogger
+
+
+# Records from this logger go to the error file only, so crash tracebacks never interleave with cycle logs
+CRASH_LOGGER = "trading_system.crash"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(error_log_path: Optional[Path] = None, level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """Route every logger through a root QueueHandler so the event loop never blocks on stdout or disk"""
+    global _listener
+    if _listener is not None:
+        return _listener
+    
+    log_queue = queue.Queue(-1)
+    formatter = jsonlogger.JsonFormatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    stream_handler.addFilter(lambda record: record.name != CRASH_LOGGER)
+    handlers = [stream_handler]
+    
+    if error_log_path is not None:
+        file_handler = logging.FileHandler(error_log_path)
+        file_handler.setLevel(logging.ERROR)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    
+    # Any handler already on the root would write synchronously on the caller's thread
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,4 +1,3 @@
-import aiohttp
 import feedparser
 import asyncio
 import time
@@ -9,6 +8,8 @@ from textblob import TextBlob
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from .config import settings
 from .redis_client import redis_client
+from .http_client import get_session
+from .single_flight import SingleFlight
 
 
 class NewsProvider(Protocol):
@@ -22,24 +23,24 @@ class MarketWatchProvider:
     
     async def fetch(self, symbols: List[str]) -> List[Dict]:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.base_url, timeout=10) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        feed = feedparser.parse(content)
-                        
-                        news_items = []
-                        for entry in feed.entries[:20]:
-                            news_items.append({
-                                "source": self.name,
-                                "title": entry.get("title", ""),
-                                "url": entry.get("link", ""),
-                                "published_at": self._parse_date(entry.get("published", "")),
-                                "content": entry.get("summary", ""),
-                                "symbols": self._extract_symbols(entry.get("title", "") + " " + entry.get("summary", ""))
-                            })
-                        
-                        return news_items
+            session = await get_session()
+            async with session.get(self.base_url, timeout=10) as response:
+                if response.status == 200:
+                    content = await response.text()
+                    feed = feedparser.parse(content)
+                    
+                    news_items = []
+                    for entry in feed.entries[:20]:
+                        news_items.append({
+                            "source": self.name,
+                            "title": entry.get("title", ""),
+                            "url": entry.get("link", ""),
+                            "published_at": self._parse_date(entry.get("published", "")),
+                            "content": entry.get("summary", ""),
+                            "symbols": self._extract_symbols(entry.get("title", "") + " " + entry.get("summary", ""))
+                        })
+                    
+                    return news_items
         except Exception as e:
             print(f"MarketWatch fetch error: {e}")
             return []
@@ -83,23 +84,23 @@ class NewsAPIProvider:
                 "pageSize": 20
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.base_url, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        news_items = []
-                        for article in data.get("articles", []):
-                            news_items.append({
-                                "source": self.name,
-                                "title": article.get("title", ""),
-                                "url": article.get("url", ""),
-                                "published_at": self._parse_date(article.get("publishedAt", "")),
-                                "content": article.get("description", ""),
-                                "symbols": self._extract_symbols(article.get("title", "") + " " + article.get("description", ""))
-                            })
-                        
-                        return news_items
+            session = await get_session()
+            async with session.get(self.base_url, params=params, timeout=10) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    
+                    news_items = []
+                    for article in data.get("articles", []):
+                        news_items.append({
+                            "source": self.name,
+                            "title": article.get("title", ""),
+                            "url": article.get("url", ""),
+                            "published_at": self._parse_date(article.get("publishedAt", "")),
+                            "content": article.get("description", ""),
+                            "symbols": self._extract_symbols(article.get("title", "") + " " + article.get("description", ""))
+                        })
+                    
+                    return news_items
         except Exception as e:
             print(f"NewsAPI fetch error: {e}")
             return []
@@ -140,23 +141,23 @@ class GNewsProvider:
                 "max": 20
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.base_url, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        news_items = []
-                        for article in data.get("articles", []):
-                            news_items.append({
-                                "source": self.name,
-                                "title": article.get("title", ""),
-                                "url": article.get("url", ""),
-                                "published_at": self._parse_date(article.get("publishedAt", "")),
-                                "content": article.get("content", ""),
-                                "symbols": self._extract_symbols(article.get("title", "") + " " + article.get("content", ""))
-                            })
-                        
-                        return news_items
+            session = await get_session()
+            async with session.get(self.base_url, params=params, timeout=10) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    
+                    news_items = []
+                    for article in data.get("articles", []):
+                        news_items.append({
+                            "source": self.name,
+                            "title": article.get("title", ""),
+                            "url": article.get("url", ""),
+                            "published_at": self._parse_date(article.get("publishedAt", "")),
+                            "content": article.get("content", ""),
+                            "symbols": self._extract_symbols(article.get("title", "") + " " + article.get("content", ""))
+                        })
+                    
+                    return news_items
         except Exception as e:
             print(f"GNews fetch error: {e}")
             return []
@@ -189,6 +190,8 @@ class NewsAggregator:
         
         self.sentiment_analyzer = SentimentIntensityAnalyzer()
         self.credibility_weights = settings.credibility_weights
+        # Symbol -> the fetch already running for it, shared by every concurrent cycle
+        self._news_flight = SingleFlight()
     
     def _calculate_sentiment(self, text: str) -> float:
         if not text:
@@ -232,7 +235,7 @@ class NewsAggregator:
         
         for provider in self.providers:
             try:
-                if redis_client.is_rate_limited(f"news_{provider.name}", 10, 60):
+                if await asyncio.to_thread(redis_client.is_rate_limited, f"news_{provider.name}", 10, 60):
                     print(f"Rate limited for {provider.name}")
                     continue
                 
@@ -241,7 +244,7 @@ class NewsAggregator:
                 
                 for symbol in symbols:
                     symbol_news = [item for item in news_items if symbol in item.get("symbols", [])]
-                    redis_client.set_news_data(provider.name, symbol, symbol_news, ttl=1800)
+                    await asyncio.to_thread(redis_client.set_news_data, provider.name, symbol, symbol_news, ttl=1800)
                 
             except Exception as e:
                 print(f"Error fetching from {provider.name}: {e}")
@@ -262,18 +265,36 @@ class NewsAggregator:
         
         return sorted(unique_news, key=lambda x: x["weight"], reverse=True)
     
-    async def get_news_for_symbol(self, symbol: str, limit: int = 10) -> List[Dict]:
-        cached_news = []
-        for provider in self.providers:
-            cached = redis_client.get_news_data(provider.name, symbol)
-            if cached:
-                cached_news.extend(cached)
-        
+    async def _cached_news(self, symbol: str) -> List[Dict]:
+        cached = await asyncio.gather(*(
+            asyncio.to_thread(redis_client.get_news_data, provider.name, symbol) for provider in self.providers
+        ))
+        news = [item for items in cached if items for item in items]
+        return sorted(news, key=lambda x: x.get("weight", 0), reverse=True)
+    
+    async def _load_news(self, symbol: str) -> List[Dict]:
+        cached_news = await self._cached_news(symbol)
         if cached_news:
-            return sorted(cached_news, key=lambda x: x.get("weight", 0), reverse=True)[:limit]
+            return cached_news
+        return await self.fetch_news([symbol])
+    
+    async def get_news_for_symbol(self, symbol: str, limit: int = 10) -> List[Dict]:
+        # Single-flight: agents cycling the same symbol at once share one cache read or provider fetch
+        news, _ = await self._news_flight.run(symbol, lambda: self._load_news(symbol))
+        return news[:limit]
+    
+    async def get_news_for_symbols(self, symbols: List[str], limit: int = 10) -> Dict[str, List[Dict]]:
+        """News for several symbols; every symbol missing from the cache is fetched in one provider pass"""
+        cached = await asyncio.gather(*(self._cached_news(symbol) for symbol in symbols))
+        missing = [symbol for symbol, news in zip(symbols, cached) if not news]
+        fresh_news = await self.fetch_news(missing) if missing else []
         
-        fresh_news = await self.fetch_news([symbol])
-        return fresh_news[:limit]
+        results = {}
+        for symbol, news in zip(symbols, cached):
+            if not news:
+                news = [item for item in fresh_news if symbol in item.get("symbols", [])]
+            results[symbol] = news[:limit]
+        return results
     
     def get_news_summary(self, news_items: List[Dict], top_k: int = 5) -> Dict:
         if not news_items:
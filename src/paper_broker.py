@@ -5,8 +5,11 @@ from typing import Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, insert
 from sqlalchemy.orm import selectinload
-from .database import PaperAccount, PaperPosition, PaperOrder, PaperFill, get_database_session
-from .coindesk_client import CoinDeskClient
+from .database import (
+    PaperAccount, PaperPosition, PaperOrder, PaperFill, get_database_session,
+    PRICE_SCALE, QTY_SCALE, to_minor
+)
+from .coindesk_client import coindesk_client
 from .config import settings
 
 
@@ -59,12 +62,19 @@ class PaperBroker:
                     "instrument": pos.instrument,
                     "quantity": float(pos.qty),
                     "avg_price": float(pos.avg_price),
-                    "market_value": float(pos.qty * pos.avg_price),
+                    "market_value": self._market_value(pos),
                     "updated_at": pos.updated_at.isoformat()
                 }
                 for pos in positions if pos.qty > 0
             ]
     
+    @staticmethod
+    def _market_value(pos: PaperPosition) -> float:
+        # Integer minor units when present; rows written before they existed fall back to Decimal
+        if pos.qty_nanos is not None and pos.avg_price_micros is not None:
+            return pos.qty_nanos * pos.avg_price_micros / (QTY_SCALE * PRICE_SCALE)
+        return float(pos.qty * pos.avg_price)
+    
     async def get_portfolio_summary(self, user_id: int) -> Dict:
         account = await self.get_or_create_account(user_id)
         positions = await self.get_positions(user_id)
@@ -76,6 +86,7 @@ class PaperBroker:
             "user_id": user_id,
             "cash_balance": float(account.cash_balance),
             "positions": positions,
+            "positions_by_instrument": {pos["instrument"]: pos for pos in positions},
             "total_position_value": total_position_value,
             "total_value": total_value,
             "pnl": total_value - float(account.starting_cash),
@@ -129,115 +140,118 @@ class PaperBroker:
             }
     
     async def _execute_market_order(self, session: AsyncSession, order: PaperOrder) -> List[Dict]:
-        async with CoinDeskClient() as client:
-            current_price = await client.get_latest_price(order.instrument)
-            
-            if not current_price:
-                order.status = "rejected"
-                await session.commit()
-                return []
-            
-            slippage = current_price * (self.slippage_bps / 10000)
-            if order.side == "buy":
-                execution_price = current_price + slippage
-            else:
-                execution_price = current_price - slippage
-            
-            if order.quantity:
-                quantity = order.quantity
-                notional = quantity * execution_price
-            else:
-                notional = order.notional
-                quantity = notional / execution_price
-            
-            fee = notional * (self.fee_bps / 10000)
-            net_notional = notional - fee if order.side == "buy" else notional + fee
-            
-            if order.side == "buy" and net_notional > order.account.cash_balance:
-                order.status = "rejected"
-                await session.commit()
-                return []
-            
-            fill = PaperFill(
-                order_id=order.id,
-                price=execution_price,
-                qty=quantity,
-                fee=fee
-            )
-            session.add(fill)
-            
-            await self._update_position(session, order.account_id, order.instrument, 
-                                      quantity, execution_price, order.side)
-            await self._update_cash_balance(session, order.account_id, net_notional, order.side)
-            
-            order.status = "filled"
+        # Process-wide client: its requests ride the shared keep-alive session in http_client
+        current_price = await coindesk_client.get_latest_price(order.instrument)
+        
+        if not current_price:
+            order.status = "rejected"
             await session.commit()
-            
-            return [{
-                "price": float(execution_price),
-                "quantity": float(quantity),
-                "fee": float(fee),
-                "filled_at": fill.filled_at.isoformat()
-            }]
+            return []
+        
+        slippage = current_price * (self.slippage_bps / 10000)
+        if order.side == "buy":
+            execution_price = current_price + slippage
+        else:
+            execution_price = current_price - slippage
+        
+        if order.quantity:
+            quantity = order.quantity
+            notional = quantity * execution_price
+        else:
+            notional = order.notional
+            quantity = notional / execution_price
+        
+        fee = notional * (self.fee_bps / 10000)
+        net_notional = notional - fee if order.side == "buy" else notional + fee
+        
+        if order.side == "buy" and net_notional > order.account.cash_balance:
+            order.status = "rejected"
+            await session.commit()
+            return []
+        
+        fill = PaperFill(
+            order_id=order.id,
+            price=execution_price,
+            qty=quantity,
+            fee=fee,
+            price_micros=to_minor(execution_price, PRICE_SCALE),
+            qty_nanos=to_minor(quantity, QTY_SCALE)
+        )
+        session.add(fill)
+        
+        await self._update_position(session, order.account_id, order.instrument, 
+                                  quantity, execution_price, order.side)
+        await self._update_cash_balance(session, order.account_id, net_notional, order.side)
+        
+        order.status = "filled"
+        await session.commit()
+        
+        return [{
+            "price": float(execution_price),
+            "quantity": float(quantity),
+            "fee": float(fee),
+            "filled_at": fill.filled_at.isoformat()
+        }]
     
     async def _execute_limit_order(self, session: AsyncSession, order: PaperOrder) -> List[Dict]:
-        async with CoinDeskClient() as client:
-            current_price = await client.get_latest_price(order.instrument)
-            
-            if not current_price:
-                order.status = "rejected"
-                await session.commit()
-                return []
-            
-            should_fill = False
-            if order.side == "buy" and current_price <= order.limit_price:
-                should_fill = True
-            elif order.side == "sell" and current_price >= order.limit_price:
-                should_fill = True
-            
-            if not should_fill:
-                order.status = "created"
-                await session.commit()
-                return []
-            
-            execution_price = order.limit_price
-            
-            if order.quantity:
-                quantity = order.quantity
-                notional = quantity * execution_price
-            else:
-                notional = order.notional
-                quantity = notional / execution_price
-            
-            fee = notional * (self.fee_bps / 10000)
-            net_notional = notional - fee if order.side == "buy" else notional + fee
-            
-            if order.side == "buy" and net_notional > order.account.cash_balance:
-                order.status = "rejected"
-                await session.commit()
-                return []
-            
-            fill = PaperFill(
-                order_id=order.id,
-                price=execution_price,
-                qty=quantity,
-                fee=fee
-            )
-            session.add(fill)
-            
-            await self._update_position(session, order.account_id, order.instrument, 
-                                      quantity, execution_price, order.side)
-            await self._update_cash_balance(session, order.account_id, net_notional, order.side)
-            
-            order.status = "filled"
+        current_price = await coindesk_client.get_latest_price(order.instrument)
+        
+        if not current_price:
+            order.status = "rejected"
             await session.commit()
-            
-            return [{
-                "price": float(execution_price),
-                "quantity": float(quantity),
-                "fee": float(fee),
-                "filled_at": fill.filled_at.isoformat()
-            }]
+            return []
+        
+        should_fill = False
+        if order.side == "buy" and current_price <= order.limit_price:
+            should_fill = True
+        elif order.side == "sell" and current_price >= order.limit_price:
+            should_fill = True
+        
+        if not should_fill:
+            order.status = "created"
+            await session.commit()
+            return []
+        
+        execution_price = order.limit_price
+        
+        if order.quantity:
+            quantity = order.quantity
+            notional = quantity * execution_price
+        else:
+            notional = order.notional
+            quantity = notional / execution_price
+        
+        fee = notional * (self.fee_bps / 10000)
+        net_notional = notional - fee if order.side == "buy" else notional + fee
+        
+        if order.side == "buy" and net_notional > order.account.cash_balance:
+            order.status = "rejected"
+            await session.commit()
+            return []
+        
+        fill = PaperFill(
+            order_id=order.id,
+            price=execution_price,
+            qty=quantity,
+            fee=fee,
+            price_micros=to_minor(execution_price, PRICE_SCALE),
+            qty_nanos=to_minor(quantity, QTY_SCALE)
+        )
+        session.add(fill)
+        
+        await self._update_position(session, order.account_id, order.instrument, 
+                                  quantity, execution_price, order.side)
+        await self._update_cash_balance(session, order.account_id, net_notional, order.side)
+        
+        order.status = "filled"
+        await session.commit()
+        
+        return [{
+            "price": float(execution_price),
+            "quantity": float(quantity),
+            "fee": float(fee),
+            "filled_at": fill.filled_at.isoformat()
+        }]
     
     async def _update_position(self, session: AsyncSession, account_id: int, 
                               instrument: str, quantity: Decimal, 
@@ -272,6 +286,8 @@ class PaperBroker:
             if position.qty < 0:
                 position.qty = Decimal("0")
         
+        position.qty_nanos = to_minor(position.qty, QTY_SCALE)
+        position.avg_price_micros = to_minor(position.avg_price, PRICE_SCALE)
         position.updated_at = session.bind.dialect.server_default_value()
     
     async def _update_cash_balance(self, session: AsyncSession, account_id: int, 
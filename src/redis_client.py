@@ -1,39 +1,118 @@
+import asyncio
 import redis
-import json
+import numpy as np
+import orjson
+import struct
 import time
-from typing import Any, Optional, Dict, List
+from typing import Any, Callable, Optional, Dict, List, Set, Tuple
 from .config import settings
 
 
+# numpy arrays and non-string keys show up in indicator payloads
+_DUMPS_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# rows, cols ahead of a packed float32 OHLCV buffer; 7 significant digits covers crypto quotes
+_OHLC_HEADER = struct.Struct("<II")
+OHLC_DTYPE = np.dtype("<f4")
+
+
 class RedisClient:
     def __init__(self):
         self.redis = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+        # Binary connection for raw ndarray buffers, which are not valid UTF-8
+        self.redis_raw = redis.Redis.from_url(settings.redis_url)
         self.rate_limit_prefix = "rate_limit:"
         self.cache_prefix = "cache:"
         self.news_prefix = "news:"
         self.ohlc_prefix = "ohlc:"
+        # Cap on unacknowledged write_behind() calls, so a stalled Redis can't pile them up
+        self.max_pending_writes = 16
+        self.writes_dropped = 0
+        self._pending_writes: Set[asyncio.Task] = set()
     
     async def ping(self) -> bool:
         try:
-            return self.redis.ping()
+            return await asyncio.to_thread(self.redis.ping)
         except Exception:
             return False
     
+    def write_behind(self, func: Callable, *args, **kwargs) -> bool:
+        """Run a sync cache write in a worker thread without awaiting it; skipped once the cap is reached"""
+        if len(self._pending_writes) >= self.max_pending_writes:
+            self.writes_dropped += 1
+            return False
+        task = asyncio.create_task(asyncio.to_thread(func, *args, **kwargs))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+        return True
+    
     def cache_set(self, key: str, value: Any, ttl: int = 300) -> bool:
         try:
-            serialized = json.dumps(value) if not isinstance(value, str) else value
+            serialized = orjson.dumps(value, option=_DUMPS_OPTIONS) if not isinstance(value, str) else value
             return self.redis.setex(f"{self.cache_prefix}{key}", ttl, serialized)
         except Exception as e:
             print(f"Redis cache_set error: {e}")
             return False
     
+    def _queue_sets(self, pipe, entries: List[Tuple[str, Any, int]]):
+        for key, value, ttl in entries:
+            serialized = orjson.dumps(value, option=_DUMPS_OPTIONS) if not isinstance(value, str) else value
+            pipe.setex(f"{self.cache_prefix}{key}", ttl, serialized)
+    
+    def pipeline_set_many(self, entries: List[Tuple[str, Any, int]]) -> bool:
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            self._queue_sets(pipe, entries)
+            return all(pipe.execute())
+        except Exception as e:
+            print(f"Redis pipeline_set_many error: {e}")
+            return False
+    
+    def cache_get_with_rate_check(self, keys: List[str], client_id: str, max_requests: int,
+                                  window_seconds: int) -> Tuple[List[Optional[Any]], bool]:
+        """Read cache keys and the client's current window count in one round trip, without counting a request"""
+        try:
+            rate_key = f"{self.rate_limit_prefix}{client_id}"
+            pipe = self.redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.get(f"{self.cache_prefix}{key}")
+            pipe.zremrangebyscore(rate_key, 0, int(time.time()) - window_seconds)
+            pipe.zcard(rate_key)
+            results = pipe.execute()
+            
+            values = []
+            for value in results[:len(keys)]:
+                try:
+                    values.append(orjson.loads(value) if value else None)
+                except orjson.JSONDecodeError:
+                    values.append(value)
+            return values, results[-1] >= max_requests
+        except Exception as e:
+            print(f"Redis cache_get_with_rate_check error: {e}")
+            return [None] * len(keys), True
+    
+    def pipeline_set_and_record(self, entries: List[Tuple[str, Any, int]], client_id: str, window_seconds: int) -> bool:
+        """Write cache entries and count one request against client_id in a single round trip"""
+        try:
+            rate_key = f"{self.rate_limit_prefix}{client_id}"
+            current_time = int(time.time())
+            pipe = self.redis.pipeline(transaction=False)
+            self._queue_sets(pipe, entries)
+            pipe.zadd(rate_key, {current_time: current_time})
+            pipe.expire(rate_key, window_seconds)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Redis pipeline_set_and_record error: {e}")
+            return False
+    
     def cache_get(self, key: str) -> Optional[Any]:
         try:
             value = self.redis.get(f"{self.cache_prefix}{key}")
             if value:
                 try:
-                    return json.loads(value)
-                except json.JSONDecodeError:
+                    return orjson.loads(value)
+                except orjson.JSONDecodeError:
                     return value
             return None
         except Exception as e:
@@ -47,6 +126,20 @@ class RedisClient:
             print(f"Redis cache_delete error: {e}")
             return False
     
+    def acquire_lock(self, name: str, ttl: int = 5) -> bool:
+        try:
+            return bool(self.redis.set(f"lock:{name}", "1", nx=True, ex=ttl))
+        except Exception as e:
+            print(f"Redis acquire_lock error: {e}")
+            return True  # Without Redis there is nothing to coordinate; let the caller proceed
+    
+    def release_lock(self, name: str) -> bool:
+        try:
+            return bool(self.redis.delete(f"lock:{name}"))
+        except Exception as e:
+            print(f"Redis release_lock error: {e}")
+            return False
+    
     def set_ohlc_data(self, symbol: str, timeframe: str, data: List[Dict], ttl: int = 300) -> bool:
         key = f"{self.ohlc_prefix}{symbol}:{timeframe}"
         return self.cache_set(key, data, ttl)
@@ -55,6 +148,28 @@ class RedisClient:
         key = f"{self.ohlc_prefix}{symbol}:{timeframe}"
         return self.cache_get(key)
     
+    def set_ohlc_bytes(self, key: str, arr: np.ndarray, ttl: int = 300) -> bool:
+        try:
+            arr = np.ascontiguousarray(arr, dtype=OHLC_DTYPE)
+            rows, cols = arr.shape
+            data = _OHLC_HEADER.pack(rows, cols) + arr.tobytes()
+            return bool(self.redis_raw.setex(f"{self.cache_prefix}{key}", ttl, data))
+        except Exception as e:
+            print(f"Redis set_ohlc_bytes error: {e}")
+            return False
+    
+    def get_ohlc_bytes(self, key: str) -> Optional[np.ndarray]:
+        """Read-only (rows, cols) view over the cached buffer, no parsing"""
+        try:
+            data = self.redis_raw.get(f"{self.cache_prefix}{key}")
+            if data is None:
+                return None
+            rows, cols = _OHLC_HEADER.unpack_from(data)
+            return np.frombuffer(data, dtype=OHLC_DTYPE, offset=_OHLC_HEADER.size).reshape(rows, cols)
+        except Exception as e:
+            print(f"Redis get_ohlc_bytes error: {e}")
+            return None
+    
     def set_latest_price(self, symbol: str, price: float, ttl: int = 60) -> bool:
         key = f"price:{symbol}:latest"
         return self.cache_set(key, price, ttl)
@@ -109,6 +224,10 @@ class RedisClient:
         key = f"market:{symbol}"
         return self.cache_set(key, data, ttl)
     
+    def mset_market_data(self, items: List[Tuple[str, Dict]], ttl: int = 60) -> bool:
+        """set_market_data for many symbols in one pipeline round trip"""
+        return self.pipeline_set_many([(f"market:{symbol}", data, ttl) for symbol, data in items])
+    
     def get_market_data(self, symbol: str) -> Optional[Dict]:
         key = f"market:{symbol}"
         return self.cache_get(key)
@@ -125,6 +244,67 @@ class RedisClient:
         key = f"portfolio:{user_id}"
         return self.cache_delete(key)
     
+    def set_indicator_state(self, instrument: str, state: Dict, ttl: int = 86400) -> bool:
+        key = f"indicator_state:{instrument}"
+        return self.cache_set(key, state, ttl)
+    
+    def get_indicator_state(self, instrument: str) -> Optional[Dict]:
+        key = f"indicator_state:{instrument}"
+        return self.cache_get(key)
+    
+    def set_ndarray(self, key: str, arr: np.ndarray, ttl: int = 300) -> bool:
+        try:
+            data = np.ascontiguousarray(arr, dtype=np.float64).tobytes()
+            return bool(self.redis_raw.setex(f"{self.cache_prefix}{key}", ttl, data))
+        except Exception as e:
+            print(f"Redis set_ndarray error: {e}")
+            return False
+    
+    def get_ndarray(self, key: str, dtype=np.float64) -> Optional[np.ndarray]:
+        try:
+            data = self.redis_raw.get(f"{self.cache_prefix}{key}")
+            return np.frombuffer(data, dtype=dtype) if data is not None else None
+        except Exception as e:
+            print(f"Redis get_ndarray error: {e}")
+            return None
+    
+    def set_indicator_arrays(self, instrument: str, stamp: str, indicators: Dict[str, Any], ttl: int = 300) -> bool:
+        # One hash per instrument: each series as raw float64 bytes, scalars and the bar stamp as JSON
+        try:
+            mapping = {"_stamp": stamp}
+            scalars = {}
+            for name, values in indicators.items():
+                if isinstance(values, (list, np.ndarray)):
+                    mapping[name] = np.ascontiguousarray(values, dtype=np.float64).tobytes()
+                else:
+                    scalars[name] = values
+            mapping["_scalars"] = orjson.dumps(scalars, option=_DUMPS_OPTIONS)
+            
+            key = f"{self.cache_prefix}indicators:{instrument}"
+            pipe = self.redis_raw.pipeline()
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, ttl)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Redis set_indicator_arrays error: {e}")
+            return False
+    
+    def get_indicator_arrays(self, instrument: str, stamp: str) -> Optional[Dict[str, Any]]:
+        try:
+            fields = self.redis_raw.hgetall(f"{self.cache_prefix}indicators:{instrument}")
+            if not fields or fields.get(b"_stamp") != stamp.encode():
+                return None
+            indicators = orjson.loads(fields[b"_scalars"])
+            for name, data in fields.items():
+                if not name.startswith(b"_"):
+                    indicators[name.decode()] = np.frombuffer(data, dtype=np.float64)
+            return indicators
+        except Exception as e:
+            print(f"Redis get_indicator_arrays error: {e}")
+            return None
+    
     def get_all_keys(self, pattern: str = "*") -> List[str]:
         try:
             return self.redis.keys(pattern)
@@ -132,6 +312,14 @@ class RedisClient:
             print(f"Redis keys error: {e}")
             return []
     
+    def count_keys(self, pattern: str = "*", batch_size: int = 1000) -> int:
+        # SCAN walks the keyspace in batches instead of blocking Redis like KEYS does
+        try:
+            return sum(1 for _ in self.redis.scan_iter(match=pattern, count=batch_size))
+        except Exception as e:
+            print(f"Redis scan error: {e}")
+            return 0
+    
     def flush_all(self) -> bool:
         try:
             return self.redis.flushall()
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _OwnerCancelled(Exception):
+    """The caller running a shared load was cancelled; its waiters retry instead of inheriting that"""
+
+
+class SingleFlight:
+    """Concurrent calls for the same key share one in-flight load"""
+    
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+    
+    async def run(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return (result, loaded); loaded is False when another caller's load was reused"""
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                # shield: a cancelled waiter must not cancel the load the others are sharing
+                return await asyncio.shield(inflight), False
+            except _OwnerCancelled:
+                continue
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await load()
+            future.set_result(result)
+            return result, True
+        except BaseException as e:
+            future.set_exception(_OwnerCancelled() if isinstance(e, asyncio.CancelledError) else e)
+            future.exception()  # mark retrieved so an unawaited future does not log
+            raise
+        finally:
+            self._inflight.pop(key, None)
@@ -1,14 +1,7 @@
 #!/usr/bin/env python3
 
-import sys
-import os
-sys.path.append('/Users/kousthubhveturi/fintech-agent')
-sys.path.append('/Users/kousthubhveturi/fintech-agent/python')
-
-os.chdir('/Users/kousthubhveturi/fintech-agent/python')
-
-from dotenv import load_dotenv
-load_dotenv()
+from src.bootstrap import init
+init()
 
 import asyncio
 from src.langgraph_agent import LangGraphTradingAgent
@@ -2,7 +2,7 @@ import json
 import uuid
 from datetime import datetime
 from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 
 @dataclass
 class Position:
@@ -31,6 +31,7 @@ class Portfolio:
     total_value: float
     total_pnl: float
     total_pnl_pct: float
+    positions_by_symbol: Dict[str, Position] = field(default_factory=dict)
 
 class VirtualTrader:
     def __init__(self, starting_cash: float = 10000.0):
@@ -74,7 +75,8 @@ class VirtualTrader:
             positions=positions,
             total_value=total_value,
             total_pnl=total_pnl_overall,
-            total_pnl_pct=total_pnl_pct
+            total_pnl_pct=total_pnl_pct,
+            positions_by_symbol={position.symbol: position for position in positions}
         )
     
     def place_order(self, symbol: str, side: str, quantity: float, price: float, order_type: str = "market") -> Dict: